@@ -1,7 +1,9 @@
 from cryptography.fernet import Fernet
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.primitives import hashes, padding
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives import padding
+from .key_derivation import derive_key, encryption_salt
 import base64
 import os
 import json
@@ -10,23 +12,27 @@ class DataEncryption:
     """通用數據加密類，支持多種加密算法"""
     
     def __init__(self):
-        self.supported_algorithms = ['AES', 'Fernet']
+        # 算法名稱 -> 實現方法，構造時建立一次，避免每次請求的字符串比較分支
+        self._encryptors = {
+            'AES': self._encrypt_aes,
+            'AES-GCM': self._encrypt_aes_gcm,
+            'Fernet': self._encrypt_fernet,
+        }
+        self._decryptors = {
+            'AES': self._decrypt_aes,
+            'AES-GCM': self._decrypt_aes_gcm,
+            'Fernet': self._decrypt_fernet,
+        }
+        self.supported_algorithms = list(self._encryptors)
     
     def _derive_key(self, password: str, salt: bytes, key_length: int = 32) -> bytes:
         """從密碼和鹽值生成加密密鑰"""
-        password_bytes = password.encode('utf-8')
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=key_length,
-            salt=salt,
-            iterations=100000,
-        )
-        return kdf.derive(password_bytes)
+        return derive_key(password, salt, key_length)
     
     def _encrypt_aes(self, data: bytes, password: str) -> bytes:
         """使用 AES 加密數據"""
-        # 生成隨機鹽值和 IV
-        salt = os.urandom(16)
+        # 獲取鹽值並生成隨機 IV
+        salt = encryption_salt()
         iv = os.urandom(16)
         
         # 生成密鑰
@@ -72,10 +78,41 @@ class DataEncryption:
         
         return data
     
+    def _encrypt_aes_gcm(self, data: bytes, password: str) -> bytes:
+        """使用 AES-256-GCM 加密數據（OpenSSL EVP，AES-NI 加速，自帶認證，無需填充）"""
+        # 獲取鹽值並生成隨機 96 位 nonce
+        salt = encryption_salt()
+        nonce = os.urandom(12)
+        
+        # 生成密鑰
+        key = self._derive_key(password, salt)
+        
+        # 加密數據，認證標籤附加在密文末尾
+        ciphertext = AESGCM(key).encrypt(nonce, data, None)
+        
+        # 組合鹽值、nonce 和加密數據
+        return salt + nonce + ciphertext
+    
+    def _decrypt_aes_gcm(self, encrypted_data: bytes, password: str) -> bytes:
+        """使用 AES-256-GCM 解密數據"""
+        # 提取鹽值、nonce 和加密數據
+        salt = encrypted_data[:16]
+        nonce = encrypted_data[16:28]
+        ciphertext = encrypted_data[28:]
+        
+        # 生成密鑰
+        key = self._derive_key(password, salt)
+        
+        # 解密並驗證認證標籤
+        try:
+            return AESGCM(key).decrypt(nonce, ciphertext, None)
+        except InvalidTag:
+            raise ValueError("密碼錯誤或數據已被篡改")
+    
     def _encrypt_fernet(self, data: bytes, password: str) -> bytes:
         """使用 Fernet 加密數據"""
-        # 生成隨機鹽值
-        salt = os.urandom(16)
+        # 獲取鹽值
+        salt = encryption_salt()
         
         # 生成密鑰
         key = base64.urlsafe_b64encode(self._derive_key(password, salt))
@@ -106,41 +143,38 @@ class DataEncryption:
         decrypted_data = f.decrypt(ciphertext)
         return decrypted_data
     
-    def encrypt(self, data: str, password: str, algorithm: str = 'AES') -> str:
-        """加密數據"""
+    def encrypt_bytes(self, data: str, password: str, algorithm: str = 'AES') -> bytes:
+        """加密數據，返回未經 base64 編碼的原始密文"""
         try:
-            if algorithm not in self.supported_algorithms:
+            encrypt_func = self._encryptors.get(algorithm)
+            if encrypt_func is None:
                 raise ValueError(f"不支持的算法: {algorithm}")
             
             # 將字符串轉換為字節
             data_bytes = data.encode('utf-8')
             
             # 根據算法選擇加密方法
-            if algorithm == 'AES':
-                encrypted_data = self._encrypt_aes(data_bytes, password)
-            elif algorithm == 'Fernet':
-                encrypted_data = self._encrypt_fernet(data_bytes, password)
-            
-            # 編碼為 base64
-            result = base64.urlsafe_b64encode(encrypted_data).decode('utf-8')
-            return result
+            return encrypt_func(data_bytes, password)
         except Exception as e:
             raise Exception(f"數據加密失敗: {str(e)}")
     
+    def encrypt(self, data: str, password: str, algorithm: str = 'AES') -> str:
+        """加密數據"""
+        # 編碼為 base64
+        return base64.urlsafe_b64encode(self.encrypt_bytes(data, password, algorithm)).decode('utf-8')
+    
     def decrypt(self, encrypted_data: str, password: str, algorithm: str = 'AES') -> str:
         """解密數據"""
         try:
-            if algorithm not in self.supported_algorithms:
+            decrypt_func = self._decryptors.get(algorithm)
+            if decrypt_func is None:
                 raise ValueError(f"不支持的算法: {algorithm}")
             
             # 解碼 base64
             encrypted_bytes = base64.urlsafe_b64decode(encrypted_data.encode('utf-8'))
             
             # 根據算法選擇解密方法
-            if algorithm == 'AES':
-                decrypted_data = self._decrypt_aes(encrypted_bytes, password)
-            elif algorithm == 'Fernet':
-                decrypted_data = self._decrypt_fernet(encrypted_bytes, password)
+            decrypted_data = decrypt_func(encrypted_bytes, password)
             
             # 轉換為字符串
             result = decrypted_data.decode('utf-8')
@@ -1,10 +1,24 @@
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from cryptography.hazmat.primitives.asymmetric import rsa, padding, utils
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
+from typing import Union, BinaryIO, Tuple
+from collections import OrderedDict
+import threading
+import hashlib
 import base64
 import json
 import os
 
+# 已解析密鑰的緩存條目上限；同一密鑰重複簽名/驗證時跳過 PEM 解碼和 ASN.1 解析
+KEY_OBJECT_CACHE_SIZE = 256
+
+# 緩存鍵是 PEM 和密碼的帶密鑰 BLAKE2b 摘要，內存中不保存明文密碼；只緩存加載成功的密鑰。
+# 緩存放在模組級別而非實例上，實例仍可被 pickle 傳入進程池
+_cache_key_secret = os.urandom(32)
+_key_cache = OrderedDict()  # 摘要 -> (私鑰或 None, 公鑰, base64 公鑰 PEM, 指紋)
+_key_cache_lock = threading.Lock()
+
+
 class DigitalSignatures:
     """數字簽名類，支持RSA密鑰生成、數字簽名和驗證"""
     
@@ -19,6 +33,40 @@ class DigitalSignatures:
             'sha3_512': hashes.SHA3_512()
         }
     
+    def _load_key(self, key_pem: str, password: str = None, is_private: bool = True) -> tuple:
+        """加載 base64 編碼的 PEM 密鑰，返回 (私鑰或 None, 公鑰, base64 公鑰 PEM, 指紋)，結果按 LRU 緩存"""
+        hasher = hashlib.blake2b(digest_size=16, key=_cache_key_secret)
+        hasher.update(b"private\0" if is_private else b"public\0")
+        hasher.update(key_pem.encode())
+        if is_private and password:
+            hasher.update(b"\0" + password.encode())
+        cache_key = hasher.digest()
+        
+        with _key_cache_lock:
+            cached = _key_cache.get(cache_key)
+            if cached is not None:
+                _key_cache.move_to_end(cache_key)
+                return cached
+        
+        key_bytes = base64.b64decode(key_pem.encode())
+        if is_private:
+            private_key = load_pem_private_key(key_bytes, password.encode() if password else None)
+            public_key = private_key.public_key()
+        else:
+            private_key = None
+            public_key = load_pem_public_key(key_bytes)
+        public_pem = public_key.public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        loaded = (private_key, public_key, base64.b64encode(public_pem).decode('utf-8'), self._get_key_fingerprint(public_key))
+        
+        with _key_cache_lock:
+            _key_cache[cache_key] = loaded
+            while len(_key_cache) > KEY_OBJECT_CACHE_SIZE:
+                _key_cache.popitem(last=False)
+        return loaded
+    
     def generate_key_pair(self, key_size: int = 2048, password: str = None) -> dict:
         """生成RSA密鑰對"""
         try:
@@ -69,14 +117,8 @@ class DigitalSignatures:
             if hash_algorithm not in self.hash_algorithms:
                 raise ValueError(f"不支持的哈希算法: {hash_algorithm}")
             
-            # 解碼私鑰
-            private_key_bytes = base64.b64decode(private_key_pem.encode())
-            
-            # 加載私鑰
-            if password:
-                private_key = load_pem_private_key(private_key_bytes, password.encode())
-            else:
-                private_key = load_pem_private_key(private_key_bytes, None)
+            # 加載私鑰（同一密鑰重複使用時命中緩存）
+            private_key, public_key, public_pem, fingerprint = self._load_key(private_key_pem, password)
             
             # 將數據轉換為字節
             data_bytes = data.encode('utf-8')
@@ -91,19 +133,12 @@ class DigitalSignatures:
                 self.hash_algorithms[hash_algorithm]
             )
             
-            # 獲取公鑰用於驗證
-            public_key = private_key.public_key()
-            public_pem = public_key.public_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PublicFormat.SubjectPublicKeyInfo
-            )
-            
             return {
                 "signature": base64.b64encode(signature).decode('utf-8'),
                 "data": data,
                 "hash_algorithm": hash_algorithm,
-                "public_key": base64.b64encode(public_pem).decode('utf-8'),
-                "fingerprint": self._get_key_fingerprint(public_key),
+                "public_key": public_pem,
+                "fingerprint": fingerprint,
                 "signature_length": len(signature)
             }
             
@@ -116,12 +151,9 @@ class DigitalSignatures:
             if hash_algorithm not in self.hash_algorithms:
                 raise ValueError(f"不支持的哈希算法: {hash_algorithm}")
             
-            # 解碼公鑰和簽名
-            public_key_bytes = base64.b64decode(public_key_pem.encode())
+            # 解碼簽名，加載公鑰（同一密鑰重複使用時命中緩存）
             signature_bytes = base64.b64decode(signature.encode())
-            
-            # 加載公鑰
-            public_key = load_pem_public_key(public_key_bytes)
+            _, public_key, _, fingerprint = self._load_key(public_key_pem, is_private=False)
             
             # 將數據轉換為字節
             data_bytes = data.encode('utf-8')
@@ -147,79 +179,76 @@ class DigitalSignatures:
                 "is_valid": is_valid,
                 "data": data,
                 "hash_algorithm": hash_algorithm,
-                "fingerprint": self._get_key_fingerprint(public_key),
+                "fingerprint": fingerprint,
                 "error_message": error_message
             }
             
         except Exception as e:
             raise Exception(f"簽名驗證失敗: {str(e)}")
     
-    def sign_file(self, file_data: bytes, private_key_pem: str, password: str = None, hash_algorithm: str = 'sha256') -> dict:
-        """對文件數據進行數字簽名"""
+    def _digest_file(self, file_data: Union[bytes, BinaryIO], hash_algorithm: str) -> Tuple[bytes, int]:
+        """計算文件摘要，返回 (摘要, 文件大小)；算法名稱與 hashlib 一致"""
+        # hashlib 經由 OpenSSL EVP 計算，支持時自動使用 SHA-NI 等硬件指令，更新時釋放 GIL
+        if isinstance(file_data, (bytes, bytearray)):
+            return hashlib.new(hash_algorithm, file_data).digest(), len(file_data)
+        
+        # file_digest 用可重用緩衝區分塊讀取文件對象，內存佔用與文件大小無關
+        file_data.seek(0)
+        digest = hashlib.file_digest(file_data, hash_algorithm).digest()
+        return digest, file_data.seek(0, 2)
+    
+    def sign_file(self, file_data: Union[bytes, BinaryIO], private_key_pem: str, password: str = None, hash_algorithm: str = 'sha256') -> dict:
+        """對文件數據進行數字簽名；可直接傳入文件對象，先分塊計算摘要再對摘要簽名"""
         try:
             if hash_algorithm not in self.hash_algorithms:
                 raise ValueError(f"不支持的哈希算法: {hash_algorithm}")
             
-            # 解碼私鑰
-            private_key_bytes = base64.b64decode(private_key_pem.encode())
+            # 加載私鑰（同一密鑰重複使用時命中緩存）
+            private_key, public_key, public_pem, fingerprint = self._load_key(private_key_pem, password)
             
-            # 加載私鑰
-            if password:
-                private_key = load_pem_private_key(private_key_bytes, password.encode())
-            else:
-                private_key = load_pem_private_key(private_key_bytes, None)
-            
-            # 創建簽名
+            # 對預先計算的摘要簽名，結果與對完整數據簽名相同
+            digest, file_size = self._digest_file(file_data, hash_algorithm)
             signature = private_key.sign(
-                file_data,
+                digest,
                 padding.PSS(
                     mgf=padding.MGF1(self.hash_algorithms[hash_algorithm]),
                     salt_length=padding.PSS.MAX_LENGTH
                 ),
-                self.hash_algorithms[hash_algorithm]
-            )
-            
-            # 獲取公鑰
-            public_key = private_key.public_key()
-            public_pem = public_key.public_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PublicFormat.SubjectPublicKeyInfo
+                utils.Prehashed(self.hash_algorithms[hash_algorithm])
             )
             
             return {
                 "signature": base64.b64encode(signature).decode('utf-8'),
-                "file_size": len(file_data),
+                "file_size": file_size,
                 "hash_algorithm": hash_algorithm,
-                "public_key": base64.b64encode(public_pem).decode('utf-8'),
-                "fingerprint": self._get_key_fingerprint(public_key)
+                "public_key": public_pem,
+                "fingerprint": fingerprint
             }
             
         except Exception as e:
             raise Exception(f"文件簽名失敗: {str(e)}")
     
-    def verify_file_signature(self, file_data: bytes, signature: str, public_key_pem: str, hash_algorithm: str = 'sha256') -> dict:
-        """驗證文件的數字簽名"""
+    def verify_file_signature(self, file_data: Union[bytes, BinaryIO], signature: str, public_key_pem: str, hash_algorithm: str = 'sha256') -> dict:
+        """驗證文件的數字簽名；可直接傳入文件對象"""
         try:
             if hash_algorithm not in self.hash_algorithms:
                 raise ValueError(f"不支持的哈希算法: {hash_algorithm}")
             
-            # 解碼公鑰和簽名
-            public_key_bytes = base64.b64decode(public_key_pem.encode())
+            # 解碼簽名，加載公鑰（同一密鑰重複使用時命中緩存）
             signature_bytes = base64.b64decode(signature.encode())
-            
-            # 加載公鑰
-            public_key = load_pem_public_key(public_key_bytes)
+            _, public_key, _, fingerprint = self._load_key(public_key_pem, is_private=False)
             
             # 驗證簽名
+            digest, file_size = self._digest_file(file_data, hash_algorithm)
             try:
                 public_key.verify(
                     signature_bytes,
-                    file_data,
+                    digest,
                     padding.PSS(
                         mgf=padding.MGF1(self.hash_algorithms[hash_algorithm]),
                         salt_length=padding.PSS.MAX_LENGTH
                     ),
-                    self.hash_algorithms[hash_algorithm]
+                    utils.Prehashed(self.hash_algorithms[hash_algorithm])
                 )
                 is_valid = True
                 error_message = None
@@ -229,9 +258,9 @@ class DigitalSignatures:
             
             return {
                 "is_valid": is_valid,
-                "file_size": len(file_data),
+                "file_size": file_size,
                 "hash_algorithm": hash_algorithm,
-                "fingerprint": self._get_key_fingerprint(public_key),
+                "fingerprint": fingerprint,
                 "error_message": error_message
             }
             
@@ -262,17 +291,7 @@ class DigitalSignatures:
     def get_key_info(self, key_pem: str, is_private: bool = True, password: str = None) -> dict:
         """獲取密鑰信息"""
         try:
-            key_bytes = base64.b64decode(key_pem.encode())
-            
-            if is_private:
-                if password:
-                    key = load_pem_private_key(key_bytes, password.encode())
-                else:
-                    key = load_pem_private_key(key_bytes, None)
-                public_key = key.public_key()
-            else:
-                public_key = load_pem_public_key(key_bytes)
-                key = None
+            _, public_key, _, fingerprint = self._load_key(key_pem, password, is_private)
             
             # 獲取密鑰大小
             key_size = public_key.key_size
@@ -280,7 +299,7 @@ class DigitalSignatures:
             return {
                 "is_private_key": is_private,
                 "key_size": key_size,
-                "fingerprint": self._get_key_fingerprint(public_key),
+                "fingerprint": fingerprint,
                 "has_password": password is not None if is_private else None,
                 "public_exponent": public_key.public_numbers().e if hasattr(public_key, 'public_numbers') else None
             }
@@ -291,20 +310,7 @@ class DigitalSignatures:
     def export_public_key(self, private_key_pem: str, password: str = None) -> str:
         """從私鑰中提取公鑰"""
         try:
-            private_key_bytes = base64.b64decode(private_key_pem.encode())
-            
-            if password:
-                private_key = load_pem_private_key(private_key_bytes, password.encode())
-            else:
-                private_key = load_pem_private_key(private_key_bytes, None)
-            
-            public_key = private_key.public_key()
-            public_pem = public_key.public_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PublicFormat.SubjectPublicKeyInfo
-            )
-            
-            return base64.b64encode(public_pem).decode('utf-8')
+            return self._load_key(private_key_pem, password)[2]
             
         except Exception as e:
             raise Exception(f"提取公鑰失敗: {str(e)}") 
\ No newline at end of file
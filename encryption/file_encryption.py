@@ -1,40 +1,60 @@
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from .key_derivation import derive_key, encryption_salt
+from typing import Union, BinaryIO, Iterator, Tuple
 import base64
-import os
 import mimetypes
 import json
+import io
+import itertools
+import os
+
+# V2 格式按固定大小分塊進行 AES-GCM 加密，讀寫時只需在內存中保留一個分塊
+CHUNK_SIZE = 1024 * 1024
+TAG_SIZE = 16
 
 class FileEncryption:
     """通用文件加密類，支持任意文件類型的加密和解密"""
     
     def __init__(self):
         self.file_header = b"ENCRYPTED_FILE_V1"
-        
+        self.stream_header = b"ENCRYPTED_FILE_V2"
+        # V1/V2 文件頭共同前綴 "ENCRYPTED_FILE_"（15 字節）的 base64 編碼，用於識別 base64 形式的加密文件
+        self.base64_header_prefix = base64.b64encode(self.file_header[:15])
+    
     def _derive_key(self, password: str, salt: bytes) -> bytes:
         """從密碼和鹽值生成加密密鑰"""
-        password_bytes = password.encode('utf-8')
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password_bytes))
-        return key
+        return base64.urlsafe_b64encode(derive_key(password, salt))
+    
+    def _as_stream(self, data: Union[bytes, BinaryIO]) -> BinaryIO:
+        """將字節數據包裝為文件對象；文件對象（如上傳的臨時文件）回到開頭後直接使用"""
+        if isinstance(data, (bytes, bytearray)):
+            return io.BytesIO(data)
+        data.seek(0)
+        return data
+    
+    def _chunk_nonce(self, nonce_prefix: bytes, counter: int) -> bytes:
+        """分塊 nonce：8 字節隨機前綴 + 4 字節計數器（0 用於元數據，分塊從 1 開始）"""
+        return nonce_prefix + counter.to_bytes(4, byteorder='big')
+    
+    def _chunk_aad(self, is_last: bool) -> bytes:
+        """附加認證數據：文件頭 + 是否為最後一塊，防止分塊被截斷或重排"""
+        return self.stream_header + (b'\x01' if is_last else b'\x00')
     
-    def encrypt_file(self, file_data: bytes, password: str, filename: str = None, preserve_metadata: bool = True) -> bytes:
-        """加密文件數據"""
+    def encrypt_file_stream(self, file_data: Union[bytes, BinaryIO], password: str, filename: str = None, preserve_metadata: bool = True) -> Tuple[int, Iterator[bytes]]:
+        """分塊加密文件，返回 (密文總大小, 逐段生成密文的迭代器)；內存中只保留一個分塊"""
         try:
-            # 生成隨機鹽值
-            salt = os.urandom(16)
+            stream = self._as_stream(file_data)
+            original_size = stream.seek(0, io.SEEK_END)
+            stream.seek(0)
             
-            # 生成密鑰
-            key = self._derive_key(password, salt)
+            # 獲取鹽值和隨機 nonce 前綴
+            salt = encryption_salt()
+            nonce_prefix = os.urandom(8)
             
-            # 創建 Fernet 實例
-            f = Fernet(key)
+            # 生成密鑰
+            aesgcm = AESGCM(derive_key(password, salt))
             
             # 準備元數據
             metadata = {}
@@ -43,44 +63,69 @@ class FileEncryption:
                 metadata['mime_type'] = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
             else:
                 metadata['mime_type'] = 'application/octet-stream'
+                
+            metadata['original_size'] = original_size
             
-            metadata['original_size'] = len(file_data)
-            
+            # 加密元數據；記錄的是密文長度，解密時據此定位文件數據
             if preserve_metadata:
                 metadata_json = json.dumps(metadata).encode('utf-8')
-                metadata_size = len(metadata_json).to_bytes(4, byteorder='big')
-            else:
-                metadata_json = b''
-                metadata_size = (0).to_bytes(4, byteorder='big')
-            
-            # 加密文件數據
-            encrypted_data = f.encrypt(file_data)
-            
-            # 如果有元數據，也加密元數據
-            if metadata_json:
-                encrypted_metadata = f.encrypt(metadata_json)
+                encrypted_metadata = aesgcm.encrypt(self._chunk_nonce(nonce_prefix, 0), metadata_json, self.stream_header)
             else:
                 encrypted_metadata = b''
+                
+            # 文件頭部分：文件頭 + 鹽值 + nonce 前綴 + 元數據大小 + 加密的元數據
+            head = b''.join((
+                self.stream_header, salt, nonce_prefix,
+                len(encrypted_metadata).to_bytes(4, byteorder='big'), encrypted_metadata
+            ))
             
-            # 組合最終結果：文件頭 + 鹽值 + 元數據大小 + 加密的元數據 + 加密的文件數據
-            result = (self.file_header + 
-                     salt + 
-                     metadata_size + 
-                     encrypted_metadata + 
-                     encrypted_data)
-            
-            return result
+            # 每個分塊的密文比明文多一個認證標籤；空文件也有一個空的最後分塊
+            chunk_count = max(1, -(-original_size // CHUNK_SIZE))
+            encrypted_size = len(head) + original_size + chunk_count * TAG_SIZE
             
         except Exception as e:
             raise Exception(f"文件加密失敗: {str(e)}")
+        
+        return encrypted_size, self._encrypt_chunks(stream, aesgcm, nonce_prefix, head)
     
-    def decrypt_file(self, encrypted_data: bytes, password: str) -> tuple:
-        """解密文件數據，返回 (文件數據, 元數據)"""
+    def _encrypt_chunks(self, stream: BinaryIO, aesgcm: AESGCM, nonce_prefix: bytes, head: bytes) -> Iterator[bytes]:
+        """先生成文件頭部分，再逐塊生成加密的分塊"""
+        yield head
+        
+        # 預讀下一塊以判斷當前塊是否為最後一塊
+        counter = 1
+        chunk = stream.read(CHUNK_SIZE)
+        while True:
+            next_chunk = stream.read(CHUNK_SIZE)
+            is_last = not next_chunk
+            yield aesgcm.encrypt(self._chunk_nonce(nonce_prefix, counter), chunk, self._chunk_aad(is_last))
+            if is_last:
+                break
+            chunk = next_chunk
+            counter += 1
+    
+    def encrypt_file(self, file_data: Union[bytes, BinaryIO], password: str, filename: str = None, preserve_metadata: bool = True) -> bytes:
+        """加密文件數據，返回完整的密文；可直接傳入文件對象，按塊讀取而不必先讀成完整的 bytes"""
+        _, chunks = self.encrypt_file_stream(file_data, password, filename, preserve_metadata)
         try:
-            # 檢查文件頭
-            header_size = len(self.file_header)
-            if encrypted_data[:header_size] != self.file_header:
+            return b''.join(chunks)
+        except Exception as e:
+            raise Exception(f"文件加密失敗: {str(e)}")
+    
+    def decrypt_file_stream(self, encrypted_data: Union[bytes, BinaryIO], password: str) -> Tuple[dict, Iterator[bytes]]:
+        """解密文件，返回 (元數據, 逐塊生成明文的迭代器)；V2 格式內存中只保留一個分塊，V1 格式整體解密"""
+        try:
+            stream = self._as_stream(encrypted_data)
+            header = stream.read(len(self.stream_header))
+            
+            if header == self.stream_header:
+                return self._open_stream(stream, password)
+            if header != self.file_header:
                 raise ValueError("無效的加密文件格式")
+                
+            # V1 格式：整個文件是一個 Fernet 令牌
+            encrypted_data = header + stream.read()
+            header_size = len(self.file_header)
             
             # 提取鹽值
             salt = encrypted_data[header_size:header_size + 16]
@@ -108,34 +153,82 @@ class FileEncryption:
             else:
                 metadata = {}
                 encrypted_file_data = encrypted_data[offset:]
-            
+                
             # 解密文件數據
             decrypted_file_data = f.decrypt(encrypted_file_data)
             
-            return decrypted_file_data, metadata
+            return metadata, iter((decrypted_file_data,))
             
         except Exception as e:
             raise Exception(f"文件解密失敗: {str(e)}")
     
-    def get_file_info(self, encrypted_data: bytes, password: str) -> dict:
+    def decrypt_file(self, encrypted_data: Union[bytes, BinaryIO], password: str) -> tuple:
+        """解密文件數據，返回 (文件數據, 元數據)"""
+        metadata, chunks = self.decrypt_file_stream(encrypted_data, password)
+        try:
+            return b''.join(chunks), metadata
+        except Exception as e:
+            raise Exception(f"文件解密失敗: {str(e)}")
+    
+    def _open_stream(self, stream: BinaryIO, password: str) -> Tuple[dict, Iterator[bytes]]:
+        """讀取 V2 格式（文件頭之後的部分）的元數據，並預先解密第一個分塊，密碼錯誤在開始輸出前即可發現"""
+        salt = stream.read(16)
+        nonce_prefix = stream.read(8)
+        metadata_size = int.from_bytes(stream.read(4), byteorder='big')
+        
+        aesgcm = AESGCM(derive_key(password, salt))
+        
+        try:
+            if metadata_size > 0:
+                metadata_json = aesgcm.decrypt(self._chunk_nonce(nonce_prefix, 0), stream.read(metadata_size), self.stream_header)
+                metadata = json.loads(metadata_json.decode('utf-8'))
+            else:
+                metadata = {}
+        except InvalidTag:
+            raise ValueError("密碼錯誤或文件已被篡改")
+        
+        chunks = self._decrypt_chunks(stream, aesgcm, nonce_prefix)
+        first_chunk = next(chunks)
+        return metadata, itertools.chain((first_chunk,), chunks)
+    
+    def _decrypt_chunks(self, stream: BinaryIO, aesgcm: AESGCM, nonce_prefix: bytes) -> Iterator[bytes]:
+        """逐塊解密 V2 格式的分塊；任何一塊認證失敗都會拋出異常，截斷或重排的文件不會被完整輸出"""
+        counter = 1
+        frame = stream.read(CHUNK_SIZE + TAG_SIZE)
+        while True:
+            next_frame = stream.read(CHUNK_SIZE + TAG_SIZE)
+            is_last = not next_frame
+            try:
+                yield aesgcm.decrypt(self._chunk_nonce(nonce_prefix, counter), frame, self._chunk_aad(is_last))
+            except InvalidTag:
+                raise ValueError("密碼錯誤或文件已被篡改")
+            if is_last:
+                break
+            frame = next_frame
+            counter += 1
+    
+    def get_file_info(self, encrypted_data: Union[bytes, BinaryIO], password: str) -> dict:
         """獲取加密文件的信息（不解密文件內容）"""
         try:
+            stream = self._as_stream(encrypted_data)
+            total_size = stream.seek(0, io.SEEK_END)
+            stream.seek(0)
+            
             # 檢查文件頭
-            header_size = len(self.file_header)
-            if encrypted_data[:header_size] != self.file_header:
+            header = stream.read(len(self.file_header))
+            if header not in (self.file_header, self.stream_header):
                 raise ValueError("無效的加密文件格式")
+            is_stream_format = header == self.stream_header
             
-            # 提取鹽值
-            salt = encrypted_data[header_size:header_size + 16]
-            
-            # 提取元數據大小
-            metadata_size_bytes = encrypted_data[header_size + 16:header_size + 20]
-            metadata_size = int.from_bytes(metadata_size_bytes, byteorder='big')
+            # 提取鹽值、nonce 前綴（僅 V2）和元數據大小
+            salt = stream.read(16)
+            nonce_prefix = stream.read(8) if is_stream_format else None
+            metadata_size = int.from_bytes(stream.read(4), byteorder='big')
             
             info = {
                 "is_encrypted_file": True,
-                "file_format_version": "V1",
-                "total_size": len(encrypted_data),
+                "file_format_version": "V2" if is_stream_format else "V1",
+                "total_size": total_size,
                 "has_metadata": metadata_size > 0,
                 "metadata_size": metadata_size
             }
@@ -143,12 +236,13 @@ class FileEncryption:
             if metadata_size > 0:
                 try:
                     # 生成密鑰並嘗試解密元數據
-                    key = self._derive_key(password, salt)
-                    f = Fernet(key)
-                    
-                    offset = header_size + 20
-                    encrypted_metadata = encrypted_data[offset:offset + metadata_size]
-                    metadata_json = f.decrypt(encrypted_metadata)
+                    encrypted_metadata = stream.read(metadata_size)
+                    if is_stream_format:
+                        aesgcm = AESGCM(derive_key(password, salt))
+                        metadata_json = aesgcm.decrypt(self._chunk_nonce(nonce_prefix, 0), encrypted_metadata, self.stream_header)
+                    else:
+                        f = Fernet(self._derive_key(password, salt))
+                        metadata_json = f.decrypt(encrypted_metadata)
                     metadata = json.loads(metadata_json.decode('utf-8'))
                     
                     info.update({
@@ -158,16 +252,20 @@ class FileEncryption:
                     })
                 except:
                     info["metadata_error"] = "無法解密元數據（密碼可能錯誤）"
-            
+                    
             return info
             
         except Exception as e:
             raise Exception(f"獲取文件信息失敗: {str(e)}")
     
+    def is_base64_encrypted_file(self, prefix: bytes) -> bool:
+        """只根據開頭的幾個字節判斷數據是否為 base64 編碼的加密文件，無需解碼全部內容"""
+        return prefix[:len(self.base64_header_prefix)] == self.base64_header_prefix
+    
     def is_encrypted_file(self, data: bytes) -> bool:
         """檢查數據是否為此格式的加密文件"""
         try:
             header_size = len(self.file_header)
-            return len(data) >= header_size and data[:header_size] == self.file_header
+            return len(data) >= header_size and data[:header_size] in (self.file_header, self.stream_header)
         except:
-            return False 
\ No newline at end of file
+            return False
@@ -1,7 +1,28 @@
 import hashlib
 import hmac
 import secrets
-from typing import Union, Optional
+import functools
+from typing import Union, Optional, BinaryIO, Tuple
+
+try:
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
+
+# scrypt 單次計算允許使用的最大內存（默認參數 n=2**14, r=8 約需 16 MiB）
+SCRYPT_MAX_MEMORY = 64 * 1024 * 1024
+
+# 算法名稱 -> 構造函數，導入時建立一次；每次請求只需一次字典查找，具名構造函數也比 hashlib.new 按名稱分派更快
+_HASHERS = {
+    name: getattr(hashlib, name) for name in (
+        'md5', 'sha1', 'sha224', 'sha256', 'sha384', 'sha512',
+        'sha3_224', 'sha3_256', 'sha3_384', 'sha3_512',
+        'blake2b', 'blake2s'
+    )
+}
+if blake3 is not None:
+    # BLAKE3 對大輸入自動多線程並行
+    _HASHERS['blake3'] = functools.partial(blake3, max_threads=blake3.AUTO)
 
 class HashFunctions:
     """哈希函數類，提供多種哈希算法和相關功能"""
@@ -10,9 +31,25 @@ class HashFunctions:
         self.supported_algorithms = [
             'md5', 'sha1', 'sha224', 'sha256', 'sha384', 'sha512',
             'sha3_224', 'sha3_256', 'sha3_384', 'sha3_512',
-            'blake2b', 'blake2s'
+            'blake2b', 'blake2s', 'blake3'
         ]
     
+    def _new_hash(self, algorithm: str, data: bytes = b''):
+        """創建哈希對象；BLAKE3 使用 blake3 庫"""
+        try:
+            return _HASHERS[algorithm](data)
+        except KeyError:
+            if algorithm == 'blake3':
+                raise Exception("需要安裝 blake3 庫: pip install blake3")
+            return hashlib.new(algorithm, data)
+    
+    def _read_chunks(self, stream: BinaryIO, chunk_size: int):
+        """用 readinto 將文件對象讀入同一個可重用緩衝區，產出無需複製的 memoryview 分塊"""
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        while size := stream.readinto(buffer):
+            yield view[:size]
+    
     def hash_text(self, text: str, algorithm: str = 'sha256', encoding: str = 'utf-8') -> str:
         """對文本進行哈希計算"""
         try:
@@ -24,8 +61,7 @@ class HashFunctions:
             text_bytes = text.encode(encoding)
             
             # 創建哈希對象
-            hash_obj = hashlib.new(algorithm)
-            hash_obj.update(text_bytes)
+            hash_obj = self._new_hash(algorithm, text_bytes)
             
             # 返回十六進制哈希值
             return hash_obj.hexdigest()
@@ -40,14 +76,34 @@ class HashFunctions:
                 raise ValueError(f"不支持的哈希算法: {algorithm}")
             
             # 創建哈希對象
-            hash_obj = hashlib.new(algorithm)
-            hash_obj.update(file_content)
+            hash_obj = self._new_hash(algorithm, file_content)
             
             # 返回十六進制哈希值
             return hash_obj.hexdigest()
         except Exception as e:
             raise Exception(f"文件內容哈希計算失敗: {str(e)}")
     
+    def hash_file_stream(self, stream: BinaryIO, algorithm: str = 'sha256', chunk_size: int = 64 * 1024) -> Tuple[str, int]:
+        """分塊讀取文件對象並增量計算哈希，內存佔用與文件大小無關，返回 (哈希值, 文件大小)"""
+        try:
+            algorithm = algorithm.lower()
+            if algorithm not in self.supported_algorithms:
+                raise ValueError(f"不支持的哈希算法: {algorithm}")
+            
+            start = stream.tell()
+            if algorithm == 'blake3':
+                hash_obj = self._new_hash(algorithm)
+                for chunk in self._read_chunks(stream, chunk_size):
+                    hash_obj.update(chunk)
+            else:
+                # hashlib.file_digest 使用可重用緩衝區和 readinto 直接送入 OpenSSL（支持 SHA-NI 等硬件加速），更新時釋放 GIL
+                hash_obj = hashlib.file_digest(stream, _HASHERS[algorithm])
+            
+            # file_digest 對 BytesIO 直接哈希其緩衝區而不移動讀取位置，因此以流末尾位置計算大小
+            return hash_obj.hexdigest(), stream.seek(0, 2) - start
+        except Exception as e:
+            raise Exception(f"文件內容哈希計算失敗: {str(e)}")
+    
     def verify_hash(self, text: str, expected_hash: str, algorithm: str = 'sha256', encoding: str = 'utf-8') -> bool:
         """驗證文本的哈希值"""
         try:
@@ -124,11 +180,14 @@ class HashFunctions:
             if algorithms is None:
                 algorithms = ['md5', 'sha1', 'sha256', 'sha512']
             
+            # 文本只編碼一次，供所有算法共用
+            text_bytes = text.encode(encoding)
+            
             results = {}
             for algorithm in algorithms:
                 if algorithm.lower() in self.supported_algorithms:
                     try:
-                        results[algorithm] = self.hash_text(text, algorithm, encoding)
+                        results[algorithm] = self._new_hash(algorithm.lower(), text_bytes).hexdigest()
                     except Exception as e:
                         results[algorithm] = f"錯誤: {str(e)}"
                 else:
@@ -138,6 +197,49 @@ class HashFunctions:
         except Exception as e:
             raise Exception(f"多重哈希計算失敗: {str(e)}")
     
+    def hash_batch(self, texts: list, algorithm: str = 'sha256', encoding: str = 'utf-8') -> list:
+        """用同一算法批量計算多條文本的哈希，結果順序與輸入一致"""
+        try:
+            algorithm = algorithm.lower()
+            if algorithm not in self.supported_algorithms:
+                raise ValueError(f"不支持的哈希算法: {algorithm}")
+            
+            # 預先取得構造函數，循環內不再按名稱查找算法
+            constructor = _HASHERS.get(algorithm) or functools.partial(self._new_hash, algorithm)
+            return [constructor(text.encode(encoding)).hexdigest() for text in texts]
+        except Exception as e:
+            raise Exception(f"批量哈希計算失敗: {str(e)}")
+    
+    def multi_hash_stream(self, stream: BinaryIO, algorithms: list = None, chunk_size: int = 64 * 1024) -> Tuple[dict, int]:
+        """單次讀取文件對象，同時用多種算法增量計算哈希，返回 ({算法: 哈希值}, 文件大小)"""
+        try:
+            if algorithms is None:
+                algorithms = ['md5', 'sha1', 'sha256', 'sha512']
+            
+            results = {}
+            hash_objs = {}
+            for algorithm in algorithms:
+                if algorithm.lower() in self.supported_algorithms:
+                    hash_objs[algorithm] = self._new_hash(algorithm.lower())
+                    results[algorithm] = None  # 佔位，保持結果順序與請求一致
+                else:
+                    results[algorithm] = f"不支持的算法: {algorithm}"
+            
+            # 每個數據塊只讀取一次，依次送入所有哈希對象
+            updaters = [hash_obj.update for hash_obj in hash_objs.values()]
+            total_size = 0
+            for chunk in self._read_chunks(stream, chunk_size):
+                for update in updaters:
+                    update(chunk)
+                total_size += len(chunk)
+            
+            for algorithm, hash_obj in hash_objs.items():
+                results[algorithm] = hash_obj.hexdigest()
+            
+            return results, total_size
+        except Exception as e:
+            raise Exception(f"多重文件哈希計算失敗: {str(e)}")
+    
     def hash_iterations(self, text: str, iterations: int = 1000, algorithm: str = 'sha256', encoding: str = 'utf-8') -> str:
         """進行多次迭代哈希計算（用於密碼存儲等安全場景）"""
         try:
@@ -151,9 +253,7 @@ class HashFunctions:
             result = text.encode(encoding)
             
             for _ in range(iterations):
-                hash_obj = hashlib.new(algorithm)
-                hash_obj.update(result)
-                result = hash_obj.digest()
+                result = self._new_hash(algorithm, result).digest()
             
             return result.hex()
         except Exception as e:
@@ -166,7 +266,7 @@ class HashFunctions:
             if algorithm not in self.supported_algorithms:
                 raise ValueError(f"不支持的哈希算法: {algorithm}")
             
-            hash_obj = hashlib.new(algorithm)
+            hash_obj = self._new_hash(algorithm)
             
             return {
                 "algorithm": algorithm,
@@ -178,7 +278,7 @@ class HashFunctions:
         except Exception as e:
             raise Exception(f"獲取哈希算法信息失敗: {str(e)}")
     
-    def crunch_hash(self, data: Union[str, bytes], salt: Optional[str] = None, iterations: int = 10000, algorithm: str = 'sha256') -> dict:
+    def crunch_hash(self, data: Union[str, bytes], salt: Optional[str] = None, iterations: int = 10000, algorithm: str = 'sha256', method: str = 'pbkdf2') -> dict:
         """Crunch Hash - 高強度哈希處理，結合鹽值和多次迭代"""
         try:
             if isinstance(data, str):
@@ -187,32 +287,57 @@ class HashFunctions:
             if salt is None:
                 salt = self.generate_salt(32)
             
-            # 組合數據和鹽值
-            salted_data = data + salt.encode('utf-8')
-            
-            # 多次迭代哈希
-            result = salted_data
-            for _ in range(iterations):
-                hash_obj = hashlib.new(algorithm)
-                hash_obj.update(result)
-                result = hash_obj.digest()
-            
-            final_hash = result.hex()
+            if method == 'pbkdf2':
+                # PBKDF2-HMAC：整個迭代循環在 OpenSSL 中完成（可使用 SHA-NI），計算期間釋放 GIL
+                final_hash = hashlib.pbkdf2_hmac(algorithm, data, salt.encode('utf-8'), iterations).hex()
+            elif method == 'iterated':
+                # 舊版算法：對 數據 + 鹽值 重複哈希，僅用於驗證以前生成的哈希
+                result = data + salt.encode('utf-8')
+                for _ in range(iterations):
+                    result = hashlib.new(algorithm, result).digest()
+                final_hash = result.hex()
+            else:
+                raise ValueError(f"不支持的方法: {method}")
             
             return {
                 "hash": final_hash,
                 "salt": salt,
                 "iterations": iterations,
                 "algorithm": algorithm,
+                "method": method,
                 "strength": "high"
             }
         except Exception as e:
             raise Exception(f"Crunch Hash 計算失敗: {str(e)}")
     
-    def verify_crunch_hash(self, data: Union[str, bytes], stored_hash: str, salt: str, iterations: int = 10000, algorithm: str = 'sha256') -> bool:
+    def verify_crunch_hash(self, data: Union[str, bytes], stored_hash: str, salt: str, iterations: int = 10000, algorithm: str = 'sha256', method: str = 'pbkdf2') -> bool:
         """驗證 Crunch Hash"""
         try:
-            result = self.crunch_hash(data, salt, iterations, algorithm)
-            return result["hash"].lower() == stored_hash.lower()
+            result = self.crunch_hash(data, salt, iterations, algorithm, method)
+            return hmac.compare_digest(result["hash"].lower(), stored_hash.lower())
+        except Exception as e:
+            raise Exception(f"Crunch Hash 驗證失敗: {str(e)}")
+    
+    def scrypt_hash(self, data: Union[str, bytes], salt: Optional[str] = None, n: int = 2 ** 14, r: int = 8, p: int = 1, dklen: int = 32) -> dict:
+        """scrypt 記憶體困難哈希，適合存儲密碼"""
+        try:
+            if isinstance(data, str):
+                data = data.encode('utf-8')
+            
+            if salt is None:
+                salt = self.generate_salt(32)
+            
+            # 所需內存約為 128 * n * r 字節；maxmem 固定上限，避免請求參數耗盡服務器內存
+            derived = hashlib.scrypt(data, salt=salt.encode('utf-8'), n=n, r=r, p=p, dklen=dklen, maxmem=SCRYPT_MAX_MEMORY)
+            
+            return {
+                "hash": derived.hex(),
+                "salt": salt,
+                "n": n,
+                "r": r,
+                "p": p,
+                "dklen": dklen,
+                "algorithm": "scrypt"
+            }
         except Exception as e:
-            raise Exception(f"Crunch Hash 驗證失敗: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"scrypt 哈希計算失敗: {str(e)}")
@@ -1,8 +1,13 @@
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.primitives import hashes, padding
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives import padding
+from .key_derivation import derive_key, encryption_salt
+from typing import Union, BinaryIO
+import io
 import os
 
+# 文件對象按 1 MiB 分塊送入加密器，無需先讀成完整的 bytes
+CHUNK_SIZE = 1024 * 1024
+
 class ImageEncryption:
     """圖像加密類，使用 AES 加密圖像數據"""
     
@@ -11,60 +16,72 @@ class ImageEncryption:
     
     def _derive_key(self, password: str, salt: bytes) -> bytes:
         """從密碼和鹽值生成加密密鑰"""
-        password_bytes = password.encode('utf-8')
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        return kdf.derive(password_bytes)
+        return derive_key(password, salt)
+    
+    def _chunks(self, data: Union[bytes, BinaryIO], offset: int = 0):
+        """從 offset 開始按塊產出數據；字節數據使用 memoryview 切片避免複製"""
+        if isinstance(data, (bytes, bytearray)):
+            view = memoryview(data)
+            for start in range(offset, len(view), CHUNK_SIZE):
+                yield view[start:start + CHUNK_SIZE]
+            return
+        data.seek(offset)
+        while chunk := data.read(CHUNK_SIZE):
+            yield chunk
     
-    def encrypt(self, image_data: bytes, password: str) -> bytes:
-        """加密圖像數據"""
+    def encrypt(self, image_data: Union[bytes, BinaryIO], password: str) -> bytes:
+        """加密圖像數據；可直接傳入文件對象"""
         try:
-            # 生成隨機鹽值和 IV
-            salt = os.urandom(16)
+            if isinstance(image_data, (bytes, bytearray)):
+                data_size = len(image_data)
+            else:
+                data_size = image_data.seek(0, io.SEEK_END)
+            
+            # 獲取鹽值並生成隨機 IV
+            salt = encryption_salt()
             iv = os.urandom(16)
             
             # 生成密鑰
             key = self._derive_key(password, salt)
             
-            # 填充圖像數據
-            padder = padding.PKCS7(128).padder()
-            padded_data = padder.update(image_data)
-            padded_data += padder.finalize()
-            
-            # 創建加密器
-            cipher = Cipher(algorithms.AES(key), modes.CBC(iv))
-            encryptor = cipher.encryptor()
-            
-            # 加密數據
-            encrypted_data = encryptor.update(padded_data) + encryptor.finalize()
-            
             # 添加標識頭和元數據
             header = b'IMGENC01'  # 8字節標識頭
-            original_size = len(image_data).to_bytes(8, byteorder='big')
+            original_size = data_size.to_bytes(8, byteorder='big')
             
             # 組合所有數據：標識頭 + 原始大小 + 鹽值 + IV + 加密數據
-            result = header + original_size + salt + iv + encrypted_data
+            output = io.BytesIO()
+            output.write(header + original_size + salt + iv)
+            
+            # 創建填充器和加密器，逐塊填充並加密
+            padder = padding.PKCS7(128).padder()
+            cipher = Cipher(algorithms.AES(key), modes.CBC(iv))
+            encryptor = cipher.encryptor()
+            
+            for chunk in self._chunks(image_data):
+                output.write(encryptor.update(padder.update(chunk)))
+            output.write(encryptor.update(padder.finalize()) + encryptor.finalize())
             
-            return result
+            return output.getvalue()
         except Exception as e:
             raise Exception(f"圖像加密失敗: {str(e)}")
     
-    def decrypt(self, encrypted_data: bytes, password: str) -> bytes:
-        """解密圖像數據"""
+    def decrypt(self, encrypted_data: Union[bytes, BinaryIO], password: str) -> bytes:
+        """解密圖像數據；可直接傳入文件對象"""
         try:
+            if isinstance(encrypted_data, (bytes, bytearray)):
+                prefix = encrypted_data[:48]
+            else:
+                encrypted_data.seek(0)
+                prefix = encrypted_data.read(48)
+            
             # 檢查標識頭
-            if len(encrypted_data) < 8 or encrypted_data[:8] != b'IMGENC01':
+            if len(prefix) < 8 or prefix[:8] != b'IMGENC01':
                 raise ValueError("無效的加密圖像文件格式")
             
             # 提取元數據
-            original_size = int.from_bytes(encrypted_data[8:16], byteorder='big')
-            salt = encrypted_data[16:32]
-            iv = encrypted_data[32:48]
-            ciphertext = encrypted_data[48:]
+            original_size = int.from_bytes(prefix[8:16], byteorder='big')
+            salt = prefix[16:32]
+            iv = prefix[32:48]
             
             # 生成密鑰
             key = self._derive_key(password, salt)
@@ -73,19 +90,18 @@ class ImageEncryption:
             cipher = Cipher(algorithms.AES(key), modes.CBC(iv))
             decryptor = cipher.decryptor()
             
-            # 解密數據
-            padded_data = decryptor.update(ciphertext) + decryptor.finalize()
-            
-            # 移除填充
+            # 逐塊解密並移除填充
             unpadder = padding.PKCS7(128).unpadder()
-            decrypted_data = unpadder.update(padded_data)
-            decrypted_data += unpadder.finalize()
+            output = io.BytesIO()
+            for chunk in self._chunks(encrypted_data, 48):
+                output.write(unpadder.update(decryptor.update(chunk)))
+            output.write(unpadder.update(decryptor.finalize()) + unpadder.finalize())
             
             # 確保數據大小正確
-            if len(decrypted_data) >= original_size:
-                decrypted_data = decrypted_data[:original_size]
+            if output.tell() > original_size:
+                output.truncate(original_size)
             
-            return decrypted_data
+            return output.getvalue()
         except Exception as e:
             raise Exception(f"圖像解密失敗: {str(e)}")
     
@@ -1,6 +1,17 @@
 from PIL import Image
+import numpy as np
 import io
 import os
+import struct
+from typing import Union, BinaryIO, Optional
+
+# 加密載荷格式：b"E1" + 4 字節大端密文長度 + 原始密文；按長度切片，無需 base64 和結束標記
+ENCRYPTED_MAGIC = b"E1"
+ENCRYPTED_LENGTH = struct.Struct(">I")
+
+# 輸出 PNG 的 zlib 級別：LSB 嵌入本身只需幾毫秒，耗時主要在 PNG 編碼；
+# 級別 1 比默認的 6 快約三到四倍；照片類圖像的文件大小相差不大，大面積平滑的合成圖像會明顯變大
+PNG_COMPRESS_LEVEL = 1
 
 class ImageSteganography:
     """圖像隱寫術類，用於在圖像中隱藏和提取文本信息"""
@@ -8,23 +19,60 @@ class ImageSteganography:
     def __init__(self):
         self.delimiter = "###END###"  # 用於標記隱藏文本的結束
         
-    def _text_to_binary(self, text: str) -> str:
-        """將文本轉換為二進制字符串"""
-        binary = ''.join(format(ord(char), '08b') for char in text)
-        return binary
+    def _bytes_to_bits(self, data: bytes) -> np.ndarray:
+        """將字節數據轉換為位數組（每個元素為 0 或 1）"""
+        return np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+    
+    def _bits_to_bytes(self, bits: np.ndarray) -> bytes:
+        """將位數組打包為字節數據（只使用完整的字節）"""
+        return np.packbits(bits[:len(bits) // 8 * 8]).tobytes()
     
-    def _binary_to_text(self, binary: str) -> str:
-        """將二進制字符串轉換為文本"""
-        text = ''
-        for i in range(0, len(binary), 8):
-            byte = binary[i:i+8]
-            if len(byte) == 8:
-                text += chr(int(byte, 2))
+    def _build_payload(self, secret_text: str, encrypt_text: bool = False, password: str = None) -> bytes:
+        """構造要隱藏的字節載荷：加密時為帶長度前綴的原始密文，否則為 UTF-8 文本加結束標記"""
+        if encrypt_text and password:
+            from .text_encryption import TextEncryption
+            ciphertext = TextEncryption().encrypt_bytes(secret_text, password)
+            return ENCRYPTED_MAGIC + ENCRYPTED_LENGTH.pack(len(ciphertext)) + ciphertext
+        return (secret_text + self.delimiter).encode('utf-8')
+    
+    def _parse_payload(self, payload: bytes, is_encrypted: bool = False, password: str = None) -> Optional[str]:
+        """解析提取出的字節載荷並在需要時解密；找不到有效載荷時返回 None"""
+        view = memoryview(payload)
+        header_size = len(ENCRYPTED_MAGIC) + ENCRYPTED_LENGTH.size
+        if view[:len(ENCRYPTED_MAGIC)] == ENCRYPTED_MAGIC and len(view) >= header_size:
+            length = ENCRYPTED_LENGTH.unpack_from(view, len(ENCRYPTED_MAGIC))[0]
+            # 長度超出載荷時，說明只是以 "E1" 開頭的普通文本
+            if header_size + length <= len(view):
+                if not is_encrypted or not password:
+                    raise ValueError("檢測到加密文本，但未提供密碼")
+                from .text_encryption import TextEncryption
+                return TextEncryption().decrypt_bytes(bytes(view[header_size:header_size + length]), password)
+        
+        # 查找結束標記
+        end = payload.find(self.delimiter.encode('utf-8'))
+        if end == -1:
+            return None
+        try:
+            text = payload[:end].decode('utf-8')
+        except UnicodeDecodeError:
+            # 舊版逐字符寫入的 Latin-1 文本
+            text = payload[:end].decode('latin-1')
+        
+        # 兼容舊版 "ENCRYPTED:" + base64 密文格式
+        if text.startswith("ENCRYPTED:"):
+            if not is_encrypted or not password:
+                raise ValueError("檢測到加密文本，但未提供密碼")
+            from .text_encryption import TextEncryption
+            text = TextEncryption().decrypt(text[10:], password)
         return text
     
-    def _bytes_to_image(self, image_bytes: bytes) -> Image.Image:
-        """將字節數據轉換為 PIL Image 對象"""
-        return Image.open(io.BytesIO(image_bytes))
+    def _bytes_to_image(self, image_bytes: Union[bytes, BinaryIO]) -> Image.Image:
+        """將字節數據或文件對象轉換為 PIL Image 對象"""
+        if isinstance(image_bytes, (bytes, bytearray)):
+            return Image.open(io.BytesIO(image_bytes))
+        # 文件對象（如上傳的臨時文件）直接交給 Pillow 按需讀取，無需先複製成 bytes
+        image_bytes.seek(0)
+        return Image.open(image_bytes)
     
     def _image_to_bytes(self, image: Image.Image, format: str = 'PNG') -> bytes:
         """將 PIL Image 對象轉換為字節數據"""
@@ -32,24 +80,14 @@ class ImageSteganography:
         # 確保使用 PNG 格式以保持質量
         if format.upper() != 'PNG':
             format = 'PNG'
-        image.save(buffer, format=format)
+        image.save(buffer, format=format, compress_level=PNG_COMPRESS_LEVEL)
         return buffer.getvalue()
     
     def hide_text_lsb(self, image_bytes: bytes, secret_text: str, encrypt_text: bool = False, password: str = None) -> bytes:
         """使用 LSB (Least Significant Bit) 方法在圖像中隱藏文本"""
         try:
-            # 如果選擇加密，先加密文本
-            if encrypt_text and password:
-                from .text_encryption import TextEncryption
-                text_crypto = TextEncryption()
-                secret_text = text_crypto.encrypt(secret_text, password)
-                secret_text = f"ENCRYPTED:{secret_text}"
-            
-            # 添加結束標記
-            secret_text += self.delimiter
-            
-            # 轉換為二進制
-            binary_secret = self._text_to_binary(secret_text)
+            # 構造載荷（加密時為長度前綴的密文，否則為文本加結束標記）並轉換為位數組
+            secret_bits = self._bytes_to_bits(self._build_payload(secret_text, encrypt_text, password))
             
             # 載入圖像
             image = self._bytes_to_image(image_bytes)
@@ -58,50 +96,21 @@ class ImageSteganography:
             if image.mode != 'RGB':
                 image = image.convert('RGB')
             
-            # 獲取圖像尺寸
-            width, height = image.size
+            # 載入像素數據（高 x 寬 x 3 的 uint8 數組）
+            pixels = np.array(image, dtype=np.uint8)
             
             # 檢查圖像是否足夠大來隱藏文本
-            max_bits = width * height * 3  # 每個像素3個通道 (R, G, B)
-            if len(binary_secret) > max_bits:
-                raise ValueError(f"圖像太小，無法隱藏 {len(binary_secret)} 位數據。最大容量: {max_bits} 位")
+            max_bits = pixels.size  # 每個像素3個通道 (R, G, B)
+            if len(secret_bits) > max_bits:
+                raise ValueError(f"圖像太小，無法隱藏 {len(secret_bits)} 位數據。最大容量: {max_bits} 位")
             
-            # 載入像素數據
-            pixels = list(image.getdata())
-            
-            binary_index = 0
-            modified_pixels = []
-            
-            for pixel in pixels:
-                r, g, b = pixel
-                
-                # 修改紅色通道的 LSB
-                if binary_index < len(binary_secret):
-                    r = (r & 0xFE) | int(binary_secret[binary_index]) # 0xFE 是 11111110，保留其他位，只修改最低 
-                    binary_index += 1
-                
-                # 修改綠色通道的 LSB
-                if binary_index < len(binary_secret):
-                    g = (g & 0xFE) | int(binary_secret[binary_index]) # 0xFE 是 11111110，保留其他位，只修改最低 
-                    binary_index += 1
-                
-                # 修改藍色通道的 LSB
-                if binary_index < len(binary_secret):
-                    b = (b & 0xFE) | int(binary_secret[binary_index]) # 0xFE 是 11111110，保留其他位，只修改最低 
-                    binary_index += 1
-                
-                modified_pixels.append((r, g, b))
-                
-                # 如果所有位都已隱藏，可以提前結束
-                if binary_index >= len(binary_secret):
-                    # 添加剩餘未修改的像素
-                    remaining_pixels = pixels[len(modified_pixels):]
-                    modified_pixels.extend(remaining_pixels)
-                    break
+            # 按 R、G、B、下一個像素… 的順序展平，向量化修改前 N 個通道的 LSB
+            # 0xFE 是 11111110，保留其他位，只修改最低位
+            flat = pixels.reshape(-1)
+            flat[:len(secret_bits)] = (flat[:len(secret_bits)] & 0xFE) | secret_bits
             
             # 創建新圖像
-            new_image = Image.new('RGB', (width, height))
-            new_image.putdata(modified_pixels)
+            new_image = Image.fromarray(pixels, 'RGB')
             
             return self._image_to_bytes(new_image, 'PNG')
             
@@ -118,52 +127,27 @@ class ImageSteganography:
             if image.mode != 'RGB':
                 image = image.convert('RGB')
             
-            # 載入像素數據
-            pixels = list(image.getdata())
-            
-            binary_secret = ""
-            
-            for pixel in pixels:
-                r, g, b = pixel
-                
-                # 提取每個通道的 LSB
-                binary_secret += str(r & 1)
-                binary_secret += str(g & 1)
-                binary_secret += str(b & 1)
-            
-            # 轉換為文本
-            extracted_text = self._binary_to_text(binary_secret)
+            # 按 R、G、B、下一個像素… 的順序展平，向量化取出每個通道的 LSB
+            bits = np.asarray(image, dtype=np.uint8).reshape(-1) & 1
             
-            # 查找結束標記
-            if self.delimiter in extracted_text:
-                extracted_text = extracted_text.split(self.delimiter)[0]
-            else:
+            # 轉換為字節並解析載荷（必要時解密）
+            extracted_text = self._parse_payload(self._bits_to_bytes(bits), is_encrypted, password)
+            if extracted_text is None:
                 raise ValueError("未找到有效的隱藏文本或文本已損壞")
             
-            # 如果文本是加密的，進行解密
-            if extracted_text.startswith("ENCRYPTED:"):
-                if not is_encrypted or not password:
-                    raise ValueError("檢測到加密文本，但未提供密碼")
-                
-                encrypted_text = extracted_text[10:]  # 移除 "ENCRYPTED:" 前綴
-                from .text_encryption import TextEncryption
-                text_crypto = TextEncryption()
-                extracted_text = text_crypto.decrypt(encrypted_text, password)
-            
             return extracted_text
             
         except Exception as e:
             raise Exception(f"提取文本失敗: {str(e)}")
     
-    def hide_text_dct(self, image_bytes: bytes, secret_text: str, strength: float = 10.0) -> bytes:
+    def hide_text_dct(self, image_bytes: bytes, secret_text: str, strength: float = 10.0,
+                      encrypt_text: bool = False, password: str = None) -> bytes:
         """使用改進的 DCT (Discrete Cosine Transform) 方法隱藏文本"""
         try:
-            import numpy as np
-            from scipy import fftpack
+            from scipy import fft
             
-            # 添加結束標記
-            secret_text += self.delimiter
-            binary_secret = self._text_to_binary(secret_text)
+            # 構造載荷並轉換為位數組
+            binary_secret = self._bytes_to_bits(self._build_payload(secret_text, encrypt_text, password))
             
             # 載入圖像
             image = self._bytes_to_image(image_bytes)
@@ -179,57 +163,29 @@ class ImageSteganography:
             height, width = img_array.shape
             
             # 檢查是否有足夠空間
-            max_capacity = (height // 8) * (width // 8)
+            block_rows, block_cols = height // 8, width // 8
+            max_capacity = block_rows * block_cols
             if len(binary_secret) > max_capacity:
                 raise ValueError(f"文本太長，無法隱藏。最大容量: {max_capacity} 位")
             
-            # 處理 8x8 塊
-            binary_index = 0
-            
-            for i in range(0, height - 7, 8):  # 確保不越界
-                for j in range(0, width - 7, 8):
-                    if binary_index >= len(binary_secret):
-                        break
-                    
-                    # 提取 8x8 塊
-                    block = img_array[i:i+8, j:j+8].copy()
-                    
-                    # 應用 DCT
-                    dct_block = fftpack.dctn(block, norm='ortho')
-                    
-                    # 在低頻區域的特定位置隱藏數據（避免 DC 分量）
-                    coeff_pos = (2, 3)  # 選擇低頻但非 DC 的位置
-                    original_coeff = dct_block[coeff_pos]
-                    
-                    # 量化嵌入：將係數量化到特定範圍
-                    quantization_step = strength * 2
-                    
-                    if binary_secret[binary_index] == '1':
-                        # 嵌入 1：使係數在奇數量化區間
-                        quantized = np.round(original_coeff / quantization_step)
-                        if quantized % 2 == 0:
-                            quantized += 1
-                    else:
-                        # 嵌入 0：使係數在偶數量化區間
-                        quantized = np.round(original_coeff / quantization_step)
-                        if quantized % 2 == 1:
-                            quantized += 1 if quantized >= 0 else -1
-                    
-                    dct_block[coeff_pos] = quantized * quantization_step
-                    
-                    # 應用逆 DCT
-                    idct_block = fftpack.idctn(dct_block, norm='ortho')
-                    
-                    # 確保值在有效範圍內
-                    idct_block = np.clip(idct_block, 0, 255)
-                    
-                    # 更新圖像塊
-                    img_array[i:i+8, j:j+8] = idct_block
-                    
-                    binary_index += 1
-                
-                if binary_index >= len(binary_secret):
-                    break
+            # 將所有完整的 8x8 塊按行優先順序重排為 (塊數, 8, 8)，只對前 N 個塊做一次批量 DCT
+            count = len(binary_secret)
+            blocks = img_array[:block_rows * 8, :block_cols * 8].reshape(block_rows, 8, block_cols, 8).swapaxes(1, 2).reshape(-1, 8, 8)
+            dct_blocks = fft.dctn(blocks[:count], axes=(-2, -1), norm='ortho', workers=-1)
+            
+            # 在低頻區域的特定位置隱藏數據（避免 DC 分量），量化嵌入：將係數量化到特定範圍
+            quantization_step = strength * 2
+            quantized = np.round(dct_blocks[:, 2, 3] / quantization_step)
+            is_odd = quantized % 2 == 1
+            # 嵌入 1：使係數在奇數量化區間
+            quantized = np.where((binary_secret == 1) & ~is_odd, quantized + 1, quantized)
+            # 嵌入 0：使係數在偶數量化區間（向遠離零的方向調整）
+            quantized = np.where((binary_secret == 0) & is_odd, quantized + np.where(quantized >= 0, 1, -1), quantized)
+            dct_blocks[:, 2, 3] = quantized * quantization_step
+            
+            # 應用逆 DCT，確保值在有效範圍內，再把修改過的塊寫回圖像
+            blocks[:count] = np.clip(fft.idctn(dct_blocks, axes=(-2, -1), norm='ortho', workers=-1), 0, 255)
+            img_array[:block_rows * 8, :block_cols * 8] = blocks.reshape(block_rows, block_cols, 8, 8).swapaxes(1, 2).reshape(block_rows * 8, block_cols * 8)
             
             # 轉換回圖像
             new_image = Image.fromarray(img_array.astype(np.uint8), 'L')
@@ -241,11 +197,11 @@ class ImageSteganography:
         except Exception as e:
             raise Exception(f"DCT 隱藏文本失敗: {str(e)}")
     
-    def extract_text_dct(self, image_bytes: bytes, strength: float = 10.0) -> str:
+    def extract_text_dct(self, image_bytes: bytes, strength: float = 10.0,
+                         is_encrypted: bool = False, password: str = None) -> str:
         """使用改進的 DCT 方法提取隱藏的文本"""
         try:
-            import numpy as np
-            from scipy import fftpack
+            from scipy import fft
             
             # 載入圖像
             image = self._bytes_to_image(image_bytes)
@@ -260,41 +216,28 @@ class ImageSteganography:
             # 獲取圖像尺寸
             height, width = img_array.shape
             
-            binary_secret = ""
-            
-            # 處理 8x8 塊
-            for i in range(0, height - 7, 8):  # 確保不越界
-                for j in range(0, width - 7, 8):
-                    # 提取 8x8 塊
-                    block = img_array[i:i+8, j:j+8]
-                    
-                    # 應用 DCT
-                    dct_block = fftpack.dctn(block, norm='ortho')
-                    
-                    # 從相同位置提取數據
-                    coeff_pos = (2, 3)
-                    coeff_value = dct_block[coeff_pos]
-                    
-                    # 量化解析
-                    quantization_step = strength * 2
-                    quantized = np.round(coeff_value / quantization_step)
-                    
-                    # 根據奇偶性判斷隱藏的位
-                    if quantized % 2 == 1:
-                        binary_secret += '1'
-                    else:
-                        binary_secret += '0'
-            
-            # 轉換為文本
-            extracted_text = self._binary_to_text(binary_secret)
-            
-            # 查找結束標記
-            if self.delimiter in extracted_text:
-                extracted_text = extracted_text.split(self.delimiter)[0]
-            else:
+            # 將所有完整的 8x8 塊重排為 (行塊數, 列塊數, 8, 8)，一次調用 DCT 處理全部塊
+            block_rows, block_cols = height // 8, width // 8
+            blocks = img_array[:block_rows * 8, :block_cols * 8].reshape(block_rows, 8, block_cols, 8).swapaxes(1, 2)
+            dct_blocks = fft.dctn(blocks, axes=(-2, -1), norm='ortho', workers=-1)
+            
+            # 從相同位置提取數據
+            coeff_values = dct_blocks[:, :, 2, 3].reshape(-1)
+            
+            # 量化解析，根據奇偶性判斷隱藏的位
+            quantization_step = strength * 2
+            quantized = np.round(coeff_values / quantization_step)
+            bits = (quantized % 2 == 1).astype(np.uint8)
+            
+            # 轉換為字節（只使用完整的字節）
+            payload = self._bits_to_bytes(bits)
+            
+            # 解析載荷（必要時解密）
+            extracted_text = self._parse_payload(payload, is_encrypted, password)
+            if extracted_text is None:
                 # 如果沒有找到完整的結束標記，嘗試找到可讀的文本部分
                 # 移除不可打印字符
-                clean_text = ''.join(char for char in extracted_text if ord(char) >= 32 and ord(char) <= 126 or ord(char) >= 19968)
+                clean_text = ''.join(char for char in payload.decode('latin-1') if ord(char) >= 32 and ord(char) <= 126 or ord(char) >= 19968)
                 if len(clean_text) > 0:
                     return clean_text
                 raise ValueError("未找到有效的隱藏文本或文本已損壞")
@@ -1,7 +1,29 @@
 from PIL import Image, ImageFilter, ImageEnhance
+import numpy as np
 import io
+import os
 import base64
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Union, BinaryIO, List
+
+# 限制最大像素數（默認約 8192x8192），防止解壓縮炸彈；MAX_IMAGE_PIXELS=0 關閉檢查，僅用於可信輸入
+Image.MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", 64 * 1024 * 1024)) or None
+
+# 導入時一次性註冊全部格式插件，避免首次打開非常見格式時再掃描
+Image.init()
+
+# JPEG 優先使用 libjpeg-turbo（SIMD IDCT/色彩轉換）解碼和編碼；未安裝 PyTurboJPEG 或找不到動態庫時使用 Pillow
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB, TJSAMP_420
+    _turbo_jpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    _turbo_jpeg = None
+
+# 與 Pillow 默認的 JPEG 質量一致，切換後端不改變輸出質量
+JPEG_QUALITY = 75
+
+# LANCZOS 在 Pillow-SIMD 中有向量化實現；reducing_gap 讓大比例縮小時先用 Image.reduce() 整數降採樣
+RESAMPLE = Image.Resampling.LANCZOS
+REDUCING_GAP = 3.0
 
 class ImageTransformation:
     """圖像變換類，提供各種圖像處理功能"""
@@ -10,9 +32,28 @@ class ImageTransformation:
         self.supported_formats = ['JPEG', 'PNG', 'BMP', 'TIFF', 'WEBP']
         self.supported_filters = ['BLUR', 'CONTOUR', 'DETAIL', 'EDGE_ENHANCE', 'EMBOSS', 'SMOOTH']
     
-    def _bytes_to_image(self, image_bytes: bytes) -> Image.Image:
-        """將字節數據轉換為 PIL Image 對象"""
-        return Image.open(io.BytesIO(image_bytes))
+    def _bytes_to_image(self, image_bytes: Union[bytes, BinaryIO]) -> Image.Image:
+        """將字節數據或文件對象轉換為 PIL Image 對象"""
+        if isinstance(image_bytes, (bytes, bytearray)):
+            return Image.open(io.BytesIO(image_bytes))
+        # 文件對象（如上傳的臨時文件）直接交給 Pillow 按需讀取，無需先複製成 bytes
+        image_bytes.seek(0)
+        return Image.open(image_bytes)
+    
+    def _decode_image(self, image_bytes: Union[bytes, BinaryIO]) -> Image.Image:
+        """解碼圖像以進行變換；RGB JPEG 交給 libjpeg-turbo 解碼"""
+        image = self._bytes_to_image(image_bytes)
+        if _turbo_jpeg is None or image.format != 'JPEG' or image.mode != 'RGB':
+            return image
+        if isinstance(image_bytes, (bytes, bytearray)):
+            jpeg_data = image_bytes
+        else:
+            image_bytes.seek(0)
+            jpeg_data = image_bytes.read()
+        decoded = Image.fromarray(_turbo_jpeg.decode(jpeg_data, pixel_format=TJPF_RGB))
+        # 保留原始格式，輸出時仍編碼為 JPEG
+        decoded.format = 'JPEG'
+        return decoded
     
     def _image_to_bytes(self, image: Image.Image, format: str = 'PNG') -> bytes:
         """將 PIL Image 對象轉換為字節數據"""
@@ -20,34 +61,73 @@ class ImageTransformation:
         # 確保 RGB 模式用於 JPEG
         if format.upper() == 'JPEG' and image.mode in ('RGBA', 'P'):
             image = image.convert('RGB')
+        if format.upper() == 'JPEG' and _turbo_jpeg is not None and image.mode == 'RGB':
+            return _turbo_jpeg.encode(np.asarray(image), quality=JPEG_QUALITY, pixel_format=TJPF_RGB, jpeg_subsample=TJSAMP_420)
         image.save(buffer, format=format.upper())
         return buffer.getvalue()
+
+    def _resize(self, image: Image.Image, width: int, height: int, maintain_aspect: bool = True) -> Image.Image:
+        if maintain_aspect:
+            # 保持縱橫比
+            image.thumbnail((width, height), RESAMPLE, reducing_gap=REDUCING_GAP)
+            return image
+        # 強制調整到指定尺寸
+        return image.resize((width, height), RESAMPLE, reducing_gap=REDUCING_GAP)
+    
+    def _rotate(self, image: Image.Image, angle: float, expand: bool = True) -> Image.Image:
+        return image.rotate(angle, expand=expand, fillcolor='white')
+    
+    def _crop(self, image: Image.Image, left: int, top: int, right: int, bottom: int) -> Image.Image:
+        return image.crop((left, top, right, bottom))
+    
+    def _filter(self, image: Image.Image, filter_name: str) -> Image.Image:
+        filter_name = filter_name.upper()
+        if filter_name not in self.supported_filters:
+            raise ValueError(f"不支持的濾鏡: {filter_name}")
+        
+        filter_map = {
+            'BLUR': ImageFilter.BLUR,
+            'CONTOUR': ImageFilter.CONTOUR,
+            'DETAIL': ImageFilter.DETAIL,
+            'EDGE_ENHANCE': ImageFilter.EDGE_ENHANCE,
+            'EMBOSS': ImageFilter.EMBOSS,
+            'SMOOTH': ImageFilter.SMOOTH
+        }
+        return image.filter(filter_map[filter_name])
+    
+    def _brightness(self, image: Image.Image, factor: float) -> Image.Image:
+        # 1.0 = 原始亮度, >1.0 = 更亮, <1.0 = 更暗
+        return ImageEnhance.Brightness(image).enhance(factor)
+    
+    def _contrast(self, image: Image.Image, factor: float) -> Image.Image:
+        # 1.0 = 原始對比度, >1.0 = 更高對比度, <1.0 = 更低對比度
+        return ImageEnhance.Contrast(image).enhance(factor)
+    
+    def _thumbnail(self, image: Image.Image, width: int = 128, height: int = 128) -> Image.Image:
+        image.thumbnail((width, height), RESAMPLE, reducing_gap=REDUCING_GAP)
+        return image
     
     def resize_image(self, image_bytes: bytes, width: int, height: int, maintain_aspect: bool = True) -> bytes:
         """調整圖像大小"""
         try:
+            # 縮小 JPEG 時 Pillow 的 thumbnail 會用 draft 模式在 DCT 域按比例解碼，比完整解碼更快，這裡不走 libjpeg-turbo 完整解碼
             image = self._bytes_to_image(image_bytes)
             original_format = image.format or 'PNG'
             
-            if maintain_aspect:
-                # 保持縱橫比
-                image.thumbnail((width, height), Image.Resampling.LANCZOS)
-            else:
-                # 強制調整到指定尺寸
-                image = image.resize((width, height), Image.Resampling.LANCZOS)
+            resized = self._resize(image, width, height, maintain_aspect)
             
-            return self._image_to_bytes(image, original_format)
+            return self._image_to_bytes(resized, original_format)
         except Exception as e:
             raise Exception(f"圖像大小調整失敗: {str(e)}")
     
     def rotate_image(self, image_bytes: bytes, angle: float, expand: bool = True) -> bytes:
         """旋轉圖像"""
         try:
-            image = self._bytes_to_image(image_bytes)
+            image = self._decode_image(image_bytes)
             original_format = image.format or 'PNG'
             
             # 旋轉圖像
-            rotated = image.rotate(angle, expand=expand, fillcolor='white')
+            rotated = self._rotate(image, angle, expand)
             
             return self._image_to_bytes(rotated, original_format)
         except Exception as e:
@@ -56,11 +136,11 @@ class ImageTransformation:
     def crop_image(self, image_bytes: bytes, left: int, top: int, right: int, bottom: int) -> bytes:
         """裁剪圖像"""
         try:
-            image = self._bytes_to_image(image_bytes)
+            image = self._decode_image(image_bytes)
             original_format = image.format or 'PNG'
             
             # 裁剪圖像
-            cropped = image.crop((left, top, right, bottom))
+            cropped = self._crop(image, left, top, right, bottom)
             
             return self._image_to_bytes(cropped, original_format)
         except Exception as e:
@@ -69,24 +149,11 @@ class ImageTransformation:
     def apply_filter(self, image_bytes: bytes, filter_name: str) -> bytes:
         """應用圖像濾鏡"""
         try:
-            image = self._bytes_to_image(image_bytes)
+            image = self._decode_image(image_bytes)
             original_format = image.format or 'PNG'
             
-            filter_name = filter_name.upper()
-            if filter_name not in self.supported_filters:
-                raise ValueError(f"不支持的濾鏡: {filter_name}")
-            
             # 應用濾鏡
-            filter_map = {
-                'BLUR': ImageFilter.BLUR,
-                'CONTOUR': ImageFilter.CONTOUR,
-                'DETAIL': ImageFilter.DETAIL,
-                'EDGE_ENHANCE': ImageFilter.EDGE_ENHANCE,
-                'EMBOSS': ImageFilter.EMBOSS,
-                'SMOOTH': ImageFilter.SMOOTH
-            }
-            
-            filtered = image.filter(filter_map[filter_name])
+            filtered = self._filter(image, filter_name)
             
             return self._image_to_bytes(filtered, original_format)
         except Exception as e:
@@ -95,12 +162,11 @@ class ImageTransformation:
     def adjust_brightness(self, image_bytes: bytes, factor: float) -> bytes:
         """調整圖像亮度"""
         try:
-            image = self._bytes_to_image(image_bytes)
+            image = self._decode_image(image_bytes)
             original_format = image.format or 'PNG'
             
-            # 調整亮度 (1.0 = 原始亮度, >1.0 = 更亮, <1.0 = 更暗)
-            enhancer = ImageEnhance.Brightness(image)
-            enhanced = enhancer.enhance(factor)
+            # 調整亮度
+            enhanced = self._brightness(image, factor)
             
             return self._image_to_bytes(enhanced, original_format)
         except Exception as e:
@@ -109,12 +175,11 @@ class ImageTransformation:
     def adjust_contrast(self, image_bytes: bytes, factor: float) -> bytes:
         """調整圖像對比度"""
         try:
-            image = self._bytes_to_image(image_bytes)
+            image = self._decode_image(image_bytes)
             original_format = image.format or 'PNG'
             
-            # 調整對比度 (1.0 = 原始對比度, >1.0 = 更高對比度, <1.0 = 更低對比度)
-            enhancer = ImageEnhance.Contrast(image)
-            enhanced = enhancer.enhance(factor)
+            # 調整對比度
+            enhanced = self._contrast(image, factor)
             
             return self._image_to_bytes(enhanced, original_format)
         except Exception as e:
@@ -123,7 +188,7 @@ class ImageTransformation:
     def convert_format(self, image_bytes: bytes, target_format: str) -> bytes:
         """轉換圖像格式"""
         try:
-            image = self._bytes_to_image(image_bytes)
+            image = self._decode_image(image_bytes)
             target_format = target_format.upper()
             
             if target_format not in self.supported_formats:
@@ -136,6 +201,10 @@ class ImageTransformation:
     def get_image_info(self, image_bytes: bytes) -> dict:
         """獲取圖像信息"""
         try:
+            if isinstance(image_bytes, (bytes, bytearray)):
+                size_bytes = len(image_bytes)
+            else:
+                size_bytes = image_bytes.seek(0, io.SEEK_END)
             image = self._bytes_to_image(image_bytes)
             
             return {
@@ -143,7 +212,7 @@ class ImageTransformation:
                 "height": image.height,
                 "format": image.format,
                 "mode": image.mode,
-                "size_bytes": len(image_bytes),
+                "size_bytes": size_bytes,
                 "has_transparency": image.mode in ('RGBA', 'LA', 'P')
             }
         except Exception as e:
@@ -152,12 +221,49 @@ class ImageTransformation:
     def create_thumbnail(self, image_bytes: bytes, size: Tuple[int, int] = (128, 128)) -> bytes:
         """創建縮略圖"""
         try:
+            # 同 resize_image：保留 Pillow 的 draft 模式縮放解碼
             image = self._bytes_to_image(image_bytes)
             original_format = image.format or 'PNG'
             
             # 創建縮略圖
-            image.thumbnail(size, Image.Resampling.LANCZOS)
+            thumbnail = self._thumbnail(image, *size)
+            
+            return self._image_to_bytes(thumbnail, original_format)
+        except Exception as e:
+            raise Exception(f"縮略圖創建失敗: {str(e)}")
+    
+    def apply_pipeline(self, image_bytes: bytes, ops: List[dict]) -> Tuple[bytes, str]:
+        """對同一張已解碼的圖像依次應用多個操作，只解碼和編碼一次"""
+        try:
+            image = self._decode_image(image_bytes)
+            output_format = image.format or 'PNG'
+            
+            operations = {
+                'resize': self._resize,
+                'rotate': self._rotate,
+                'crop': self._crop,
+                'filter': self._filter,
+                'brightness': self._brightness,
+                'contrast': self._contrast,
+                'thumbnail': self._thumbnail
+            }
+            
+            for op in ops:
+                params = dict(op)
+                op_type = params.pop('type', None)
+                if op_type == 'convert':
+                    # 格式轉換只影響最終編碼
+                    output_format = params.get('target_format', '').upper()
+                    if output_format not in self.supported_formats:
+                        raise ValueError(f"不支持的格式: {output_format}")
+                    continue
+                if op_type not in operations:
+                    raise ValueError(f"不支持的操作: {op_type}")
+                try:
+                    image = operations[op_type](image, **params)
+                except TypeError:
+                    raise ValueError(f"操作 {op_type} 的參數無效: {params}")
             
-            return self._image_to_bytes(image, original_format)
+            return self._image_to_bytes(image, output_format), output_format
         except Exception as e:
-            raise Exception(f"縮略圖創建失敗: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"圖像管道處理失敗: {str(e)}")
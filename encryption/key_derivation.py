@@ -0,0 +1,57 @@
+# 密鑰派生模組：PBKDF2 派生結果按 (密碼, 鹽值) 緩存，重複調用無需再次迭代
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+import os
+
+PBKDF2_ITERATIONS = 100000
+
+# 派生密鑰緩存的條目上限和存活時間（秒）；密碼輪換後舊密鑰最多保留 KEY_CACHE_TTL 秒
+KEY_CACHE_SIZE = 1024
+KEY_CACHE_TTL = float(os.getenv("KEY_CACHE_TTL", "3600"))
+
+# 每個進程生成一次的加密鹽值；鹽值仍隨密文一起存儲，解密不依賴於生成它的進程。
+# IV/nonce 仍然每次隨機生成，因此同一密鑰加密多條消息是安全的。
+_process_salt = os.urandom(16)
+
+# 緩存鍵使用密碼的帶密鑰 BLAKE2b 摘要，內存中不保存明文密碼
+_cache_key_secret = os.urandom(32)
+_key_cache = OrderedDict()  # (密碼摘要, 鹽值, 長度) -> (派生密鑰, 寫入時間)
+_key_cache_lock = threading.Lock()
+
+
+def encryption_salt() -> bytes:
+    """返回加密時使用的鹽值，使同一密碼的密鑰派生可以命中緩存"""
+    return _process_salt
+
+
+def derive_key(password: str, salt: bytes, length: int = 32) -> bytes:
+    """從密碼和鹽值派生密鑰（PBKDF2-HMAC-SHA256）"""
+    password_bytes = password.encode('utf-8')
+    cache_key = (hashlib.blake2b(password_bytes, digest_size=16, key=_cache_key_secret).digest(), salt, length)
+    now = time.monotonic()
+
+    with _key_cache_lock:
+        cached = _key_cache.get(cache_key)
+        if cached is not None and now - cached[1] < KEY_CACHE_TTL:
+            _key_cache.move_to_end(cache_key)
+            return cached[0]
+
+    # PBKDF2 計算在鎖外進行，不阻塞其他密碼的緩存查詢
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=length,
+        salt=salt,
+        iterations=PBKDF2_ITERATIONS,
+    )
+    key = kdf.derive(password_bytes)
+
+    with _key_cache_lock:
+        _key_cache[cache_key] = (key, now)
+        _key_cache.move_to_end(cache_key)
+        while len(_key_cache) > KEY_CACHE_SIZE:
+            _key_cache.popitem(last=False)
+    return key
@@ -2,6 +2,53 @@ import io
 import base64
 from PIL import Image
 import json
+from typing import Union, BinaryIO
+
+# 聯絡人字段 -> vCard 屬性名，按此順序輸出
+VCARD_FIELDS = (
+    ('name', 'FN'),
+    ('phone', 'TEL'),
+    ('email', 'EMAIL'),
+    ('org', 'ORG'),
+    ('url', 'URL'),
+)
+
+
+def _render_qr_png(data: str, error_correction: str, box_size: int, border: int, fill_color: str, back_color: str) -> bytes:
+    """編碼並渲染 QR 碼 PNG；重複請求由 ETagMiddleware 按字節上限緩存響應，這裡不再另設緩存"""
+    import qrcode
+    from qrcode.constants import ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q, ERROR_CORRECT_H
+    
+    # 設置錯誤修正級別
+    error_correct_map = {
+        'L': ERROR_CORRECT_L,
+        'M': ERROR_CORRECT_M,
+        'Q': ERROR_CORRECT_Q,
+        'H': ERROR_CORRECT_H
+    }
+    
+    if error_correction not in error_correct_map:
+        raise ValueError(f"不支持的錯誤修正級別: {error_correction}")
+    
+    # 創建QR碼實例
+    qr = qrcode.QRCode(
+        version=1,  # 控制QR碼的大小，1是最小的
+        error_correction=error_correct_map[error_correction],
+        box_size=box_size,
+        border=border,
+    )
+    
+    # 添加數據
+    qr.add_data(data)
+    qr.make(fit=True)
+    
+    # 創建圖像
+    qr_image = qr.make_image(fill_color=fill_color, back_color=back_color)
+    
+    # 轉換為字節
+    buffer = io.BytesIO()
+    qr_image.save(buffer, format='PNG')
+    return buffer.getvalue()
 
 class QRCodeGenerator:
     """QR碼生成器類，支持生成和讀取QR碼"""
@@ -23,39 +70,7 @@ class QRCodeGenerator:
                         back_color: str = 'white') -> bytes:
         """生成QR碼圖像"""
         try:
-            import qrcode
-            from qrcode.constants import ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q, ERROR_CORRECT_H
-            
-            # 設置錯誤修正級別
-            error_correct_map = {
-                'L': ERROR_CORRECT_L,
-                'M': ERROR_CORRECT_M,
-                'Q': ERROR_CORRECT_Q,
-                'H': ERROR_CORRECT_H
-            }
-            
-            if error_correction not in error_correct_map:
-                raise ValueError(f"不支持的錯誤修正級別: {error_correction}")
-            
-            # 創建QR碼實例
-            qr = qrcode.QRCode(
-                version=1,  # 控制QR碼的大小，1是最小的
-                error_correction=error_correct_map[error_correction],
-                box_size=box_size,
-                border=border,
-            )
-            
-            # 添加數據
-            qr.add_data(data)
-            qr.make(fit=True)
-            
-            # 創建圖像
-            qr_image = qr.make_image(fill_color=fill_color, back_color=back_color)
-            
-            # 轉換為字節
-            buffer = io.BytesIO()
-            qr_image.save(buffer, format='PNG')
-            return buffer.getvalue()
+            return _render_qr_png(data, error_correction, box_size, border, fill_color, back_color)
             
         except ImportError:
             raise Exception("需要安裝 qrcode 庫: pip install qrcode[pil]")
@@ -125,14 +140,18 @@ class QRCodeGenerator:
         except Exception as e:
             raise Exception(f"帶Logo的QR碼生成失敗: {str(e)}")
     
-    def read_qr_code(self, image_data: bytes) -> dict:
-        """讀取QR碼內容"""
+    def read_qr_code(self, image_data: Union[bytes, BinaryIO]) -> dict:
+        """讀取QR碼內容；可直接傳入文件對象，由 Pillow 從中解碼圖像"""
         try:
             from pyzbar import pyzbar
             import numpy as np
             
             # 載入圖像
-            image = Image.open(io.BytesIO(image_data))
+            if isinstance(image_data, (bytes, bytearray)):
+                image_data = io.BytesIO(image_data)
+            else:
+                image_data.seek(0)
+            image = Image.open(image_data)
             
             # 轉換為RGB模式
             if image.mode != 'RGB':
@@ -192,25 +211,11 @@ class QRCodeGenerator:
     def generate_contact_qr(self, contact_info: dict) -> bytes:
         """生成聯絡人QR碼"""
         try:
-            # vCard格式
-            vcard = "BEGIN:VCARD\nVERSION:3.0\n"
-            
-            if 'name' in contact_info:
-                vcard += f"FN:{contact_info['name']}\n"
-            
-            if 'phone' in contact_info:
-                vcard += f"TEL:{contact_info['phone']}\n"
-            
-            if 'email' in contact_info:
-                vcard += f"EMAIL:{contact_info['email']}\n"
-            
-            if 'org' in contact_info:
-                vcard += f"ORG:{contact_info['org']}\n"
-            
-            if 'url' in contact_info:
-                vcard += f"URL:{contact_info['url']}\n"
-            
-            vcard += "END:VCARD"
+            # vCard格式：一次 join 拼接，避免逐行字符串相加
+            lines = ["BEGIN:VCARD", "VERSION:3.0"]
+            lines += [f"{prop}:{contact_info[field]}" for field, prop in VCARD_FIELDS if field in contact_info]
+            lines.append("END:VCARD")
+            vcard = "\n".join(lines)
             
             return self.generate_qr_code(vcard, error_correction='M')
             
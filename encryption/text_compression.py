@@ -3,24 +3,130 @@ import zlib
 import bz2
 import lzma
 import base64
-from typing import Union
+from typing import Union, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    # libdeflate 單次緩衝區壓縮速度約為 zlib 的兩倍，輸出仍是標準 gzip/zlib 格式
+    import deflate
+except ImportError:
+    deflate = None
+
+# 壓縮數據的文件頭魔數，用於未指定算法時自動識別
+COMPRESSION_MAGIC_NUMBERS = (
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'lzma'),
+)
 
 class TextCompression:
     """文本壓縮類，支持多種壓縮算法"""
     
     def __init__(self):
-        self.supported_algorithms = ['gzip', 'zlib', 'bz2', 'lzma']
+        # 算法名稱 -> 實現方法，構造時建立一次，避免每次請求的字符串比較分支
+        self._compressors = {
+            'zstd': self._compress_zstd,
+            'gzip': self._compress_gzip,
+            'zlib': self._compress_zlib,
+            'bz2': self._compress_bz2,
+            'lzma': self._compress_lzma,
+        }
+        self._decompressors = {
+            'zstd': self._decompress_zstd,
+            'gzip': self._decompress_gzip,
+            'zlib': self._decompress_zlib,
+            'bz2': self._decompress_bz2,
+            'lzma': self._decompress_lzma,
+        }
+        self.supported_algorithms = list(self._compressors)
+        # zstd 級別 3 的壓縮率與 gzip 級別 6 相當，速度快數倍；未安裝 zstandard 時回退到 gzip
+        self.default_algorithm = 'zstd' if zstandard is not None else 'gzip'
+        # 未指定級別時各算法使用的默認級別；gzip/zlib 偏向速度：級別 1 比 6 快約四分之一，對重複性高的文本壓縮率相差無幾
+        self.default_levels = {'zstd': 3, 'gzip': 1, 'zlib': 1, 'bz2': 9, 'lzma': 6}
+        # 按意圖選擇級別的預設；libdeflate 的 gzip/zlib 最高級別為 12，標準庫 zlib 為 9
+        max_deflate_level = 12 if deflate is not None else 9
+        self.preset_levels = {
+            'fast': {'zstd': 1, 'gzip': 1, 'zlib': 1, 'bz2': 1, 'lzma': 0},
+            'balanced': {'zstd': 3, 'gzip': 6, 'zlib': 6, 'bz2': 9, 'lzma': 6},
+            'max': {'zstd': 19, 'gzip': max_deflate_level, 'zlib': max_deflate_level, 'bz2': 9, 'lzma': 9},
+        }
+        # /compress/compare 中額外比較的 zstd 級別：快速、均衡、高壓縮率
+        self.zstd_comparison_levels = (3, 10, 15)
+    
+    def _compress_zstd(self, data: bytes, level: int = 3) -> bytes:
+        """使用 zstd 壓縮數據"""
+        if zstandard is None:
+            raise ImportError("需要安裝 zstandard 庫: pip install zstandard")
+        # ZstdCompressor 實例不能跨線程共用，每次調用單獨創建
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    
+    def _decompress_zstd(self, data: bytes) -> bytes:
+        """使用 zstd 解壓數據"""
+        if zstandard is None:
+            raise ImportError("需要安裝 zstandard 庫: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    
+    def detect_algorithm(self, data: bytes) -> str:
+        """根據文件頭魔數識別壓縮算法"""
+        for magic, algorithm in COMPRESSION_MAGIC_NUMBERS:
+            if data.startswith(magic):
+                return algorithm
+        # zlib 頭的兩個字節按大端組成的數能被 31 整除，且壓縮方法為 deflate
+        if len(data) >= 2 and data[0] & 0x0F == 8 and (data[0] << 8 | data[1]) % 31 == 0:
+            return 'zlib'
+        raise ValueError("無法識別壓縮格式，請指定算法")
+    
+    def resolve(self, algorithm: Optional[str] = None, level: Optional[int] = None, preset: Optional[str] = None) -> tuple:
+        """補全未指定的算法和級別，返回 (算法, 級別)；明確的級別優先於預設"""
+        algorithm = (algorithm or self.default_algorithm).lower()
+        if algorithm not in self._compressors:
+            raise ValueError(f"不支持的壓縮算法: {algorithm}")
+        if level is not None:
+            return algorithm, level
+        if preset is not None:
+            if preset not in self.preset_levels:
+                raise ValueError(f"不支持的壓縮預設: {preset}，可選 {', '.join(self.preset_levels)}")
+            return algorithm, self.preset_levels[preset][algorithm]
+        return algorithm, self.default_levels[algorithm]
+    
+    def _compress(self, data: bytes, algorithm: Optional[str], level: Optional[int]) -> bytes:
+        """按算法壓縮；未指定算法或級別時使用默認算法和該算法的默認級別"""
+        algorithm, level = self.resolve(algorithm, level)
+        return self._compressors[algorithm](data, level)
+    
+    def _decompress(self, data: bytes, algorithm: Optional[str]) -> bytes:
+        """按算法解壓；未指定算法時根據文件頭自動識別"""
+        return self._decompress_detected(data, algorithm)[0]
+    
+    def _decompress_detected(self, data: bytes, algorithm: Optional[str]) -> tuple:
+        """按算法解壓，返回 (解壓數據, 實際使用的算法)；未指定算法時根據文件頭自動識別"""
+        algorithm = (algorithm or self.detect_algorithm(data)).lower()
+        decompress = self._decompressors.get(algorithm)
+        if decompress is None:
+            raise ValueError(f"不支持的壓縮算法: {algorithm}")
+        return decompress(data), algorithm
     
     def _compress_gzip(self, data: bytes, level: int = 6) -> bytes:
         """使用 gzip 壓縮數據"""
-        return gzip.compress(data, compresslevel=level)
+        if deflate is not None:
+            return bytes(deflate.gzip_compress(data, level))
+        # wbits=31 讓 zlib 直接輸出 gzip 格式：單次調用完成壓縮和 CRC，且 mtime 為 0，輸出是確定性的
+        return zlib.compress(data, level=level, wbits=31)
     
     def _decompress_gzip(self, data: bytes) -> bytes:
         """使用 gzip 解壓數據"""
+        # 解壓仍使用標準庫：libdeflate 綁定遇到多成員 gzip 或尾部多餘數據時會靜默截斷
         return gzip.decompress(data)
     
     def _compress_zlib(self, data: bytes, level: int = 6) -> bytes:
         """使用 zlib 壓縮數據"""
+        if deflate is not None:
+            return bytes(deflate.zlib_compress(data, level))
         return zlib.compress(data, level=level)
     
     def _decompress_zlib(self, data: bytes) -> bytes:
@@ -43,25 +149,14 @@ class TextCompression:
         """使用 lzma 解壓數據"""
         return lzma.decompress(data)
     
-    def compress_text(self, text: str, algorithm: str = 'gzip', level: int = 6) -> str:
+    def compress_text(self, text: str, algorithm: Optional[str] = None, level: Optional[int] = None) -> str:
         """壓縮文本"""
         try:
-            algorithm = algorithm.lower()
-            if algorithm not in self.supported_algorithms:
-                raise ValueError(f"不支持的壓縮算法: {algorithm}")
-            
             # 將文本轉換為字節
             text_bytes = text.encode('utf-8')
             
             # 根據算法壓縮
-            if algorithm == 'gzip':
-                compressed_data = self._compress_gzip(text_bytes, level)
-            elif algorithm == 'zlib':
-                compressed_data = self._compress_zlib(text_bytes, level)
-            elif algorithm == 'bz2':
-                compressed_data = self._compress_bz2(text_bytes, level)
-            elif algorithm == 'lzma':
-                compressed_data = self._compress_lzma(text_bytes, level)
+            compressed_data = self._compress(text_bytes, algorithm, level)
             
             # 編碼為 base64
             encoded_data = base64.b64encode(compressed_data).decode('utf-8')
@@ -70,36 +165,30 @@ class TextCompression:
         except Exception as e:
             raise Exception(f"文本壓縮失敗: {str(e)}")
     
-    def decompress_text(self, compressed_text: str, algorithm: str = 'gzip') -> str:
+    def decompress_text(self, compressed_text: str, algorithm: Optional[str] = None) -> str:
         """解壓文本"""
+        return self.decompress_text_detected(compressed_text, algorithm)[0]
+    
+    def decompress_text_detected(self, compressed_text: str, algorithm: Optional[str] = None) -> tuple:
+        """解壓文本，返回 (文本, 實際使用的算法)；未指定算法時為自動識別出的算法"""
         try:
-            algorithm = algorithm.lower()
-            if algorithm not in self.supported_algorithms:
-                raise ValueError(f"不支持的壓縮算法: {algorithm}")
-            
             # 解碼 base64
             compressed_data = base64.b64decode(compressed_text.encode('utf-8'))
             
             # 根據算法解壓
-            if algorithm == 'gzip':
-                decompressed_data = self._decompress_gzip(compressed_data)
-            elif algorithm == 'zlib':
-                decompressed_data = self._decompress_zlib(compressed_data)
-            elif algorithm == 'bz2':
-                decompressed_data = self._decompress_bz2(compressed_data)
-            elif algorithm == 'lzma':
-                decompressed_data = self._decompress_lzma(compressed_data)
+            decompressed_data, algorithm = self._decompress_detected(compressed_data, algorithm)
             
             # 轉換為字符串
             result = decompressed_data.decode('utf-8')
             
-            return result
+            return result, algorithm
         except Exception as e:
             raise Exception(f"文本解壓失敗: {str(e)}")
     
-    def get_compression_stats(self, text: str, algorithm: str = 'gzip', level: int = 6) -> dict:
+    def get_compression_stats(self, text: str, algorithm: Optional[str] = None, level: Optional[int] = None) -> dict:
         """獲取壓縮統計信息"""
         try:
+            algorithm, level = self.resolve(algorithm, level)
             original_size = len(text.encode('utf-8'))
             compressed_text = self.compress_text(text, algorithm, level)
             compressed_size = len(base64.b64decode(compressed_text.encode('utf-8')))
@@ -120,70 +209,58 @@ class TextCompression:
         except Exception as e:
             raise Exception(f"獲取壓縮統計失敗: {str(e)}")
     
+    def compare_algorithm(self, text_bytes: bytes, algorithm: str, level: Optional[int] = 6) -> dict:
+        """計算單個算法的壓縮效果；各算法互不依賴，可並行調用"""
+        try:
+            original_size = len(text_bytes)
+            compressed_size = len(self.compress_file_content(text_bytes, algorithm, level))
+            compression_ratio = compressed_size / original_size if original_size > 0 else 0
+            space_saved_percent = ((original_size - compressed_size) / original_size) * 100 if original_size > 0 else 0
+            
+            return {
+                "compressed_size_bytes": compressed_size,
+                "compression_ratio": round(compression_ratio, 4),
+                "space_saved_percent": round(space_saved_percent, 2)
+            }
+        except Exception as e:
+            return {"error": str(e)}
+    
+    def comparison_candidates(self, level: int = 6) -> list:
+        """返回參與比較的 (結果名稱, 算法, 級別)：所有算法使用同一級別，另外比較 zstd 的幾個典型級別"""
+        candidates = [(algorithm, algorithm, level) for algorithm in self.supported_algorithms]
+        candidates += [(f"zstd-{zstd_level}", 'zstd', zstd_level) for zstd_level in self.zstd_comparison_levels]
+        return candidates
+    
     def compare_algorithms(self, text: str, level: int = 6) -> dict:
         """比較不同壓縮算法的效果"""
         try:
-            results = {}
-            original_size = len(text.encode('utf-8'))
+            text_bytes = text.encode('utf-8')
             
-            for algorithm in self.supported_algorithms:
-                try:
-                    compressed_text = self.compress_text(text, algorithm, level)
-                    compressed_size = len(base64.b64decode(compressed_text.encode('utf-8')))
-                    compression_ratio = compressed_size / original_size if original_size > 0 else 0
-                    space_saved_percent = ((original_size - compressed_size) / original_size) * 100 if original_size > 0 else 0
-                    
-                    results[algorithm] = {
-                        "compressed_size_bytes": compressed_size,
-                        "compression_ratio": round(compression_ratio, 4),
-                        "space_saved_percent": round(space_saved_percent, 2)
-                    }
-                except Exception as e:
-                    results[algorithm] = {"error": str(e)}
+            results = {}
+            for name, algorithm, algorithm_level in self.comparison_candidates(level):
+                results[name] = self.compare_algorithm(text_bytes, algorithm, algorithm_level)
             
             return {
-                "original_size_bytes": original_size,
+                "original_size_bytes": len(text_bytes),
                 "algorithms": results
             }
         except Exception as e:
             raise Exception(f"算法比較失敗: {str(e)}")
     
-    def compress_file_content(self, file_content: bytes, algorithm: str = 'gzip', level: int = 6) -> bytes:
+    def compress_file_content(self, file_content: bytes, algorithm: Optional[str] = None, level: Optional[int] = None) -> bytes:
         """壓縮文件內容（字節數據）"""
         try:
-            algorithm = algorithm.lower()
-            if algorithm not in self.supported_algorithms:
-                raise ValueError(f"不支持的壓縮算法: {algorithm}")
-            
             # 根據算法壓縮
-            if algorithm == 'gzip':
-                return self._compress_gzip(file_content, level)
-            elif algorithm == 'zlib':
-                return self._compress_zlib(file_content, level)
-            elif algorithm == 'bz2':
-                return self._compress_bz2(file_content, level)
-            elif algorithm == 'lzma':
-                return self._compress_lzma(file_content, level)
-                
+            return self._compress(file_content, algorithm, level)
+            
         except Exception as e:
             raise Exception(f"文件內容壓縮失敗: {str(e)}")
     
-    def decompress_file_content(self, compressed_content: bytes, algorithm: str = 'gzip') -> bytes:
+    def decompress_file_content(self, compressed_content: bytes, algorithm: Optional[str] = None) -> bytes:
         """解壓文件內容（字節數據）"""
         try:
-            algorithm = algorithm.lower()
-            if algorithm not in self.supported_algorithms:
-                raise ValueError(f"不支持的壓縮算法: {algorithm}")
-            
             # 根據算法解壓
-            if algorithm == 'gzip':
-                return self._decompress_gzip(compressed_content)
-            elif algorithm == 'zlib':
-                return self._decompress_zlib(compressed_content)
-            elif algorithm == 'bz2':
-                return self._decompress_bz2(compressed_content)
-            elif algorithm == 'lzma':
-                return self._decompress_lzma(compressed_content)
-                
+            return self._decompress(compressed_content, algorithm)
+            
         except Exception as e:
             raise Exception(f"文件內容解壓失敗: {str(e)}") 
\ No newline at end of file
@@ -1,8 +1,6 @@
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from .key_derivation import derive_key, encryption_salt
 import base64
-import os
 
 class TextEncryption:
     """文本加密類，使用 Fernet 對稱加密"""
@@ -12,21 +10,13 @@ class TextEncryption:
     
     def _derive_key(self, password: str, salt: bytes) -> bytes:
         """從密碼和鹽值生成加密密鑰"""
-        password_bytes = password.encode('utf-8')
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password_bytes))
-        return key
+        return base64.urlsafe_b64encode(derive_key(password, salt))
     
-    def encrypt(self, text: str, password: str) -> str:
-        """加密文本"""
+    def encrypt_bytes(self, text: str, password: str) -> bytes:
+        """加密文本，返回未經 base64 編碼的原始字節（鹽值 + Fernet 令牌）"""
         try:
-            # 生成隨機鹽值
-            salt = os.urandom(16)
+            # 獲取鹽值
+            salt = encryption_salt()
             
             # 生成密鑰
             key = self._derive_key(password, salt)
@@ -39,18 +29,26 @@ class TextEncryption:
             encrypted_text = f.encrypt(text_bytes)
             
             # 組合鹽值和加密文本
-            result = base64.urlsafe_b64encode(salt + encrypted_text).decode('utf-8')
-            
-            return result
+            return salt + encrypted_text
         except Exception as e:
             raise Exception(f"文本加密失敗: {str(e)}")
     
+    def encrypt(self, text: str, password: str) -> str:
+        """加密文本"""
+        return base64.urlsafe_b64encode(self.encrypt_bytes(text, password)).decode('utf-8')
+    
     def decrypt(self, encrypted_text: str, password: str) -> str:
         """解密文本"""
         try:
             # 解碼 base64
             encrypted_data = base64.urlsafe_b64decode(encrypted_text.encode('utf-8'))
-            
+        except Exception as e:
+            raise Exception(f"文本解密失敗: {str(e)}")
+        return self.decrypt_bytes(encrypted_data, password)
+    
+    def decrypt_bytes(self, encrypted_data: bytes, password: str) -> str:
+        """解密 encrypt_bytes 返回的原始字節（鹽值 + Fernet 令牌）"""
+        try:
             # 提取鹽值和加密文本
             salt = encrypted_data[:16]
             encrypted_content = encrypted_data[16:]
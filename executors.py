@@ -0,0 +1,46 @@
+# 執行器：將 CPU 密集型工作移出事件循環線程
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# C 擴展（OpenSSL、zlib/bz2/lzma、Pillow、pyzbar）在計算時會釋放 GIL，用線程池即可並行且無需序列化參數
+thread_pool = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="cpu")
+
+# 純 Python 循環（隱寫術像素處理、舊版 Crunch Hash 迭代）和 RSA 密鑰生成會長時間持有 GIL，需要用進程池
+_process_pool = None
+
+# 子進程由 forkserver 啟動，而不是從已有線程池和 OpenSSL 狀態的工作進程直接 fork，
+# 在 uvicorn/gunicorn 多進程部署下也不會繼承其他線程持有的鎖
+_process_context = multiprocessing.get_context("forkserver")
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """延遲創建進程池，避免在 uvicorn 主進程 fork 工作進程之前就啟動子進程"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=_process_context)
+    return _process_pool
+
+
+async def run_in_thread(func, *args, **kwargs):
+    """在線程池中執行釋放 GIL 的 C 級計算"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(thread_pool, functools.partial(func, *args, **kwargs))
+
+
+async def run_in_process(func, *args, **kwargs):
+    """在進程池中執行持有 GIL 的純 Python 計算；參數和返回值必須可序列化"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executors():
+    """關閉線程池和進程池"""
+    global _process_pool
+    thread_pool.shutdown(wait=False, cancel_futures=True)
+    if _process_pool is not None:
+        # 等待子進程退出；不等待時解釋器退出階段會向已關閉的喚醒管道寫入
+        _process_pool.shutdown(wait=True, cancel_futures=True)
+        _process_pool = None
@@ -1,11 +1,22 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Query, Form
-from fastapi.responses import FileResponse, StreamingResponse
-from pydantic import BaseModel
-from typing import Optional, List
+from fastapi import FastAPI, HTTPException, UploadFile, File, Query, Form, Header, Depends
+from fastapi.responses import Response, ORJSONResponse, StreamingResponse
+from fastapi.exceptions import RequestValidationError
+from fastapi.encoders import jsonable_encoder
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.formparsers import MultiPartParser
+from cryptography.hazmat.backends.openssl.backend import backend as openssl_backend
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from pydantic import BaseModel, ConfigDict, Field
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Optional, List, Literal
+from urllib.parse import quote
 import uvicorn
+import asyncio
 import os
-import io
-import tempfile
+import functools
+import logging
+import ssl
 import base64
 from encryption.text_encryption import TextEncryption
 from encryption.data_encryption import DataEncryption
@@ -17,108 +28,325 @@ from encryption.image_steganography import ImageSteganography
 from encryption.file_encryption import FileEncryption
 from encryption.digital_signatures import DigitalSignatures
 from encryption.qr_code_generator import QRCodeGenerator
+from middleware import ETagMiddleware, CompressionMiddleware, UploadLimitMiddleware
+from executors import run_in_thread, run_in_process, shutdown_executors
+
+logger = logging.getLogger("uvicorn.error")
+
+def check_crypto_backend():
+    """啟動自檢：所有 AES 運算和 RSA 簽名驗證都經由 cryptography 的 OpenSSL 後端（可使用 AES-NI / ARMv8 CE），記錄 OpenSSL 版本"""
+    AESGCM(bytes(32)).encrypt(bytes(12), b"self-test", None)
+    logger.info("加密後端: %s", openssl_backend.openssl_version_text())
+    # 文件哈希與簽名摘要經由 hashlib（Python 鏈接的 OpenSSL，可能與 cryptography 自帶的版本不同）
+    logger.info("哈希後端: %s", ssl.OPENSSL_VERSION)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    check_crypto_backend()
+    yield
+    # 服務關閉時釋放線程池和進程池
+    shutdown_executors()
 
 app = FastAPI(
     title="加密與處理 API 服務",
     description="提供文本、數據和圖像加密/解密、圖像變換、文本壓縮、哈希服務、數字簽名和QR碼生成的綜合 FastAPI 應用程式",
-    version="3.0.0"
+    version="3.0.0",
+    lifespan=lifespan,
+    # orjson 序列化速度約為標準庫 json 的數倍
+    default_response_class=ORJSONResponse
 )
 
+# 錯誤響應同樣使用 orjson 序列化（默認處理器使用標準庫 json）
+@app.exception_handler(StarletteHTTPException)
+async def http_exception_handler(request, exc: StarletteHTTPException):
+    return ORJSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=getattr(exc, "headers", None))
+
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request, exc: RequestValidationError):
+    return ORJSONResponse({"detail": jsonable_encoder(exc.errors())}, status_code=422)
+
+# 16 MiB 以下的上傳文件保留在內存中，避免溢出到磁盤臨時文件
+MultiPartParser.max_file_size = 16 * 1024 * 1024
+
+# 確定性端點：輸出只取決於請求內容，可使用 ETag 緩存並返回 304
+DETERMINISTIC_PATHS = [
+    "/",
+    "/hash/text",
+    "/hash/batch",
+    "/hash/file",
+    "/hash/file/multi",
+    "/compress/text",
+    "/transform/image/info",
+    "/stego/capacity",
+    "/qr/generate",
+    "/qr/wifi",
+    "/qr/contact",
+    "/qr/url"
+]
+app.add_middleware(ETagMiddleware, paths=DETERMINISTIC_PATHS)
+
+# 響應壓縮：JSON 中的 base64/十六進制數據可壓縮 2-4 倍；優先 Brotli，回退到低級別 gzip 以降低 CPU 開銷
+app.add_middleware(CompressionMiddleware, minimum_size=512, gzip_level=1, brotli_quality=4)
+
+# 請求體大小限制：默認 50 MiB；流式哈希端點的內存佔用與文件大小無關，允許 1 GiB
+UPLOAD_SIZE_LIMITS = {
+    "/hash/file": 1024 * 1024 * 1024,
+    "/hash/file/multi": 1024 * 1024 * 1024
+}
+app.add_middleware(UploadLimitMiddleware, default_limit=50 * 1024 * 1024, limits=UPLOAD_SIZE_LIMITS)
+
 # 請求模型
-class TextEncryptRequest(BaseModel):
+# 端點均未聲明返回類型或 response_model，FastAPI 不會對響應再做一次 Pydantic 驗證；
+# 新增端點時請保持這一點，需要文檔時使用 response_model=None 顯式關閉
+class RequestModel(BaseModel):
+    """請求模型基類：請求體在處理過程中不會被修改，凍結後可省去賦值驗證；拒絕未知字段"""
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+class TextEncryptRequest(RequestModel):
     text: str
     password: str
 
-class TextDecryptRequest(BaseModel):
+class TextDecryptRequest(RequestModel):
     encrypted_text: str
     password: str
 
-class DataEncryptRequest(BaseModel):
+class DataEncryptRequest(RequestModel):
     data: str
     password: str
     algorithm: Optional[str] = "AES"
 
-class DataDecryptRequest(BaseModel):
+class DataDecryptRequest(RequestModel):
     encrypted_data: str
     password: str
     algorithm: Optional[str] = "AES"
 
 # 文本壓縮請求模型
-class TextCompressRequest(BaseModel):
+class TextCompressRequest(RequestModel):
     text: str
-    algorithm: Optional[str] = "gzip"
-    level: Optional[int] = 6
+    algorithm: Optional[str] = None  # 默認 zstd（未安裝 zstandard 時為 gzip）
+    level: Optional[int] = None  # 默認使用所選算法的默認級別
+    preset: Optional[str] = None  # fast、balanced 或 max；指定 level 時忽略
 
-class TextDecompressRequest(BaseModel):
+class TextDecompressRequest(RequestModel):
     compressed_text: str
-    algorithm: Optional[str] = "gzip"
+    algorithm: Optional[str] = None  # 未指定時根據文件頭自動識別
 
 # 哈希請求模型
-class HashRequest(BaseModel):
+class HashRequest(RequestModel):
     text: str
     algorithm: Optional[str] = "sha256"
 
-class HashVerifyRequest(BaseModel):
+class HashBatchRequest(RequestModel):
+    texts: List[str]
+    algorithm: Optional[str] = "sha256"
+
+class HashVerifyRequest(RequestModel):
     text: str
     expected_hash: str
     algorithm: Optional[str] = "sha256"
 
-class CrunchHashRequest(BaseModel):
+class CrunchHashRequest(RequestModel):
     data: str
     salt: Optional[str] = None
     iterations: Optional[int] = 10000
     algorithm: Optional[str] = "sha256"
+    method: Optional[str] = "pbkdf2"  # pbkdf2 或 iterated（舊版逐次迭代哈希）
+
+class ScryptHashRequest(RequestModel):
+    data: str
+    salt: Optional[str] = None
+    n: Optional[int] = 2 ** 14
+    r: Optional[int] = 8
+    p: Optional[int] = 1
+    dklen: Optional[int] = 32
 
 # 數字簽名請求模型
-class KeyPairRequest(BaseModel):
+class KeyPairRequest(RequestModel):
     key_size: Optional[int] = 2048
     password: Optional[str] = None
 
-class SignDataRequest(BaseModel):
+class SignDataRequest(RequestModel):
     data: str
     private_key: str
     password: Optional[str] = None
     hash_algorithm: Optional[str] = "sha256"
 
-class VerifySignatureRequest(BaseModel):
+class VerifySignatureRequest(RequestModel):
     data: str
     signature: str
     public_key: str
     hash_algorithm: Optional[str] = "sha256"
 
+# 圖像管道請求模型：每個操作形如 {"type": "resize", "width": 800, "height": 600}
+# 限制單個請求的操作數，防止一個請求串聯任意多次縮放等操作佔滿 CPU
+MAX_PIPELINE_OPS = 16
 
+class ImagePipelineRequest(RequestModel):
+    ops: List[dict] = Field(max_length=MAX_PIPELINE_OPS)
 
 # QR碼請求模型
-class QRGenerateRequest(BaseModel):
+class QRGenerateRequest(RequestModel):
     data: str
     error_correction: Optional[str] = "M"
     box_size: Optional[int] = 10
     border: Optional[int] = 4
+    response_format: Literal["json", "png"] = "json"  # png 時直接返回圖像字節
 
-class QRWifiRequest(BaseModel):
+class QRWifiRequest(RequestModel):
     ssid: str
     password: str
     security: Optional[str] = "WPA"
     hidden: Optional[bool] = False
+    response_format: Literal["json", "png"] = "json"
 
-class QRContactRequest(BaseModel):
+class QRContactRequest(RequestModel):
     name: Optional[str] = None
     phone: Optional[str] = None
     email: Optional[str] = None
     org: Optional[str] = None
     url: Optional[str] = None
-
-# 初始化加密和處理類
-text_crypto = TextEncryption()
-data_crypto = DataEncryption()
-image_crypto = ImageEncryption()
-image_transform = ImageTransformation()
-text_compressor = TextCompression()
-hash_functions = HashFunctions()
-image_stego = ImageSteganography()
-file_crypto = FileEncryption()
-digital_signer = DigitalSignatures()
-qr_generator = QRCodeGenerator()
+    response_format: Literal["json", "png"] = "json"
+
+# 上傳文件輔助函數
+# 常見圖像格式的文件頭魔數：PNG、JPEG、GIF、RIFF（WebP）、BMP、TIFF（小端/大端）
+IMAGE_MAGIC_NUMBERS = (b'\x89PNG', b'\xff\xd8\xff', b'GIF8', b'RIFF', b'BM', b'II*\x00', b'MM\x00*')
+
+async def is_image_upload(file: UploadFile) -> bool:
+    """根據文件頭魔數判斷上傳文件是否為圖像，不信任客戶端提供的 Content-Type"""
+    header = await file.read(16)
+    await file.seek(0)
+    if header.startswith(b'RIFF'):
+        # RIFF 容器也用於 WAV/AVI，只接受 WebP
+        return header[8:12] == b'WEBP'
+    return header.startswith(IMAGE_MAGIC_NUMBERS)
+
+async def validated_image(file: UploadFile = File(...)) -> UploadFile:
+    """圖像上傳依賴項：在端點執行前校驗文件頭，非圖像直接返回 400"""
+    if not await is_image_upload(file):
+        raise HTTPException(status_code=400, detail="文件必須是圖像格式")
+    return file
+
+# 超過此大小的圖像在進程池中變換，Pillow 中持有 GIL 的部分不會相互阻塞；
+# 小圖像的序列化和進程間拷貝開銷大於收益，直接把臨時文件對象交給線程池
+PROCESS_POOL_MIN_IMAGE_SIZE = 256 * 1024
+
+async def run_image_transform(func, file: UploadFile, *args):
+    """按上傳大小選擇執行器執行圖像變換"""
+    if file.size is not None and file.size > PROCESS_POOL_MIN_IMAGE_SIZE:
+        # 跨進程只能傳遞 bytes
+        return await run_in_process(func, await file.read(), *args)
+    return await run_in_thread(func, file.file, *args)
+
+# 響應輔助函數
+def attachment_disposition(filename: str) -> str:
+    """生成附件的 Content-Disposition 頭"""
+    # 非 ASCII 文件名按 RFC 5987 使用 filename* 編碼
+    quoted_filename = quote(filename)
+    if quoted_filename != filename:
+        return f"attachment; filename*=utf-8''{quoted_filename}"
+    return f'attachment; filename="{filename}"'
+
+def attachment_response(content: bytes, media_type: str, filename: str, headers: Optional[dict] = None) -> Response:
+    """直接從內存以附件形式返回文件，不經過臨時文件"""
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": attachment_disposition(filename), **(headers or {})}
+    )
+
+def attachment_stream_response(chunks, media_type: str, filename: str, headers: Optional[dict] = None) -> StreamingResponse:
+    """以附件形式逐塊發送迭代器生成的內容；同步迭代器在線程池中執行，內存中只保留當前分塊"""
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": attachment_disposition(filename), **(headers or {})}
+    )
+
+try:
+    # pybase64 使用 SIMD 指令進行 base64 編解碼，比標準庫快數倍；未安裝時使用標準庫
+    from pybase64 import b64encode_as_string, b64decode
+except ImportError:
+    def b64encode_as_string(data: bytes) -> str:
+        return base64.b64encode(data).decode('ascii')
+    b64decode = base64.b64decode
+
+def wants_binary(accept: Optional[str]) -> bool:
+    """客戶端是否通過 Accept: application/octet-stream 要求原始字節響應"""
+    return accept is not None and 'application/octet-stream' in accept
+
+def qr_png_response(qr_image: bytes) -> Response:
+    """直接返回 QR 碼 PNG，省去 base64 編碼（體積減少約 25%）和 JSON 封裝"""
+    return Response(content=qr_image, media_type="image/png", headers={"Content-Disposition": "inline; filename=qr.png"})
+
+def binary_response(content: bytes, algorithm: str) -> Response:
+    """返回原始字節，省去 base64 編碼（體積減少約 25%）和 JSON 封裝"""
+    return Response(
+        content=content,
+        media_type='application/octet-stream',
+        headers={"X-Algorithm": algorithm}
+    )
+
+# 初始化加密和處理類：工廠函數經 lru_cache 緩存，每個進程只構造一次，其他模組調用 get_* 也返回同一實例
+@lru_cache(maxsize=1)
+def get_text_crypto() -> TextEncryption:
+    return TextEncryption()
+
+@lru_cache(maxsize=1)
+def get_data_crypto() -> DataEncryption:
+    return DataEncryption()
+
+@lru_cache(maxsize=1)
+def get_image_crypto() -> ImageEncryption:
+    return ImageEncryption()
+
+@lru_cache(maxsize=1)
+def get_image_transform() -> ImageTransformation:
+    return ImageTransformation()
+
+@lru_cache(maxsize=1)
+def get_text_compressor() -> TextCompression:
+    return TextCompression()
+
+@lru_cache(maxsize=1)
+def get_hash_functions() -> HashFunctions:
+    return HashFunctions()
+
+@lru_cache(maxsize=1)
+def get_image_stego() -> ImageSteganography:
+    return ImageSteganography()
+
+@lru_cache(maxsize=1)
+def get_file_crypto() -> FileEncryption:
+    return FileEncryption()
+
+@lru_cache(maxsize=1)
+def get_digital_signer() -> DigitalSignatures:
+    return DigitalSignatures()
+
+@lru_cache(maxsize=1)
+def get_qr_generator() -> QRCodeGenerator:
+    return QRCodeGenerator()
+
+text_crypto = get_text_crypto()
+data_crypto = get_data_crypto()
+image_crypto = get_image_crypto()
+image_transform = get_image_transform()
+text_compressor = get_text_compressor()
+hash_functions = get_hash_functions()
+image_stego = get_image_stego()
+file_crypto = get_file_crypto()
+digital_signer = get_digital_signer()
+qr_generator = get_qr_generator()
+
+# 啟動時為每個數據加密算法預先綁定處理函數；未知算法在進入線程池之前即可拒絕
+DATA_ENCRYPTORS = {
+    algorithm: functools.partial(data_crypto.encrypt, algorithm=algorithm)
+    for algorithm in data_crypto.supported_algorithms
+}
+DATA_DECRYPTORS = {
+    algorithm: functools.partial(data_crypto.decrypt, algorithm=algorithm)
+    for algorithm in data_crypto.supported_algorithms
+}
 
 @app.get("/")
 async def root():
@@ -149,13 +377,17 @@ async def root():
                 "contrast": "/transform/image/contrast",
                 "convert_format": "/transform/image/convert",
                 "thumbnail": "/transform/image/thumbnail",
-                "info": "/transform/image/info"
+                "info": "/transform/image/info",
+                "pipeline": "/transform/image/pipeline"
             },
             "hash": {
                 "hash_text": "/hash/text",
                 "verify_hash": "/hash/verify",
                 "multi_hash": "/hash/multi",
+                "batch_hash": "/hash/batch",
+                "multi_hash_file": "/hash/file/multi",
                 "crunch_hash": "/hash/crunch",
+                "scrypt_hash": "/hash/scrypt",
                 "verify_crunch": "/hash/crunch/verify"
             },
             "steganography": {
@@ -188,9 +420,12 @@ async def root():
 
 # 文本加密端點
 @app.post("/encrypt/text")
-async def encrypt_text(request: TextEncryptRequest):
+async def encrypt_text(request: TextEncryptRequest, accept: Optional[str] = Header(None)):
     try:
-        encrypted_text = text_crypto.encrypt(request.text, request.password)
+        if wants_binary(accept):
+            encrypted_bytes = await run_in_thread(text_crypto.encrypt_bytes, request.text, request.password)
+            return binary_response(encrypted_bytes, "Fernet")
+        encrypted_text = await run_in_thread(text_crypto.encrypt, request.text, request.password)
         return {
             "status": "success",
             "encrypted_text": encrypted_text,
@@ -202,7 +437,7 @@ async def encrypt_text(request: TextEncryptRequest):
 @app.post("/decrypt/text")
 async def decrypt_text(request: TextDecryptRequest):
     try:
-        decrypted_text = text_crypto.decrypt(request.encrypted_text, request.password)
+        decrypted_text = await run_in_thread(text_crypto.decrypt, request.encrypted_text, request.password)
         return {
             "status": "success",
             "decrypted_text": decrypted_text,
@@ -213,9 +448,15 @@ async def decrypt_text(request: TextDecryptRequest):
 
 # 數據加密端點
 @app.post("/encrypt/data")
-async def encrypt_data(request: DataEncryptRequest):
+async def encrypt_data(request: DataEncryptRequest, accept: Optional[str] = Header(None)):
     try:
-        encrypted_data = data_crypto.encrypt(request.data, request.password, request.algorithm)
+        encrypt = DATA_ENCRYPTORS.get(request.algorithm)
+        if encrypt is None:
+            raise ValueError(f"不支持的算法: {request.algorithm}")
+        if wants_binary(accept):
+            encrypted_bytes = await run_in_thread(data_crypto.encrypt_bytes, request.data, request.password, request.algorithm)
+            return binary_response(encrypted_bytes, request.algorithm)
+        encrypted_data = await run_in_thread(encrypt, request.data, request.password)
         return {
             "status": "success",
             "encrypted_data": encrypted_data,
@@ -228,7 +469,10 @@ async def encrypt_data(request: DataEncryptRequest):
 @app.post("/decrypt/data")
 async def decrypt_data(request: DataDecryptRequest):
     try:
-        decrypted_data = data_crypto.decrypt(request.encrypted_data, request.password, request.algorithm)
+        decrypt = DATA_DECRYPTORS.get(request.algorithm)
+        if decrypt is None:
+            raise ValueError(f"不支持的算法: {request.algorithm}")
+        decrypted_data = await run_in_thread(decrypt, request.encrypted_data, request.password)
         return {
             "status": "success",
             "decrypted_data": decrypted_data,
@@ -240,63 +484,44 @@ async def decrypt_data(request: DataDecryptRequest):
 
 # 圖像加密端點
 @app.post("/encrypt/image")
-async def encrypt_image(password: str, file: UploadFile = File(...)):
+async def encrypt_image(password: str, file: UploadFile = Depends(validated_image)):
     try:
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="文件必須是圖像格式")
-        
-        # 讀取上傳的圖像
-        image_data = await file.read()
-        
-        # 加密圖像
-        encrypted_data = image_crypto.encrypt(image_data, password)
-        
-        # 保存加密文件
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.enc') as temp_file:
-            temp_file.write(encrypted_data)
-            temp_file_path = temp_file.name
+        # 加密圖像：直接傳入上傳的臨時文件對象，按塊讀取
+        encrypted_data = await run_in_thread(image_crypto.encrypt, file.file, password)
         
-        return FileResponse(
-            temp_file_path,
-            media_type='application/octet-stream',
-            filename=f"encrypted_{file.filename}.enc"
-        )
+        # 直接從內存返回加密文件
+        return attachment_response(encrypted_data, 'application/octet-stream', f"encrypted_{file.filename}.enc")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"圖像加密失敗: {str(e)}")
 
 @app.post("/decrypt/image")
 async def decrypt_image(password: str, file: UploadFile = File(...)):
     try:
-        # 讀取加密文件
-        encrypted_data = await file.read()
-        
-        # 解密圖像
-        decrypted_data = image_crypto.decrypt(encrypted_data, password)
+        # 解密圖像：直接傳入上傳的臨時文件對象，按塊讀取
+        decrypted_data = await run_in_thread(image_crypto.decrypt, file.file, password)
         
-        # 保存解密文件
-        original_filename = file.filename.replace('.enc', '') if file.filename.endswith('.enc') else file.filename
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-            temp_file.write(decrypted_data)
-            temp_file_path = temp_file.name
-        
-        return FileResponse(
-            temp_file_path,
-            media_type='image/jpeg',
-            filename=f"decrypted_{original_filename}"
-        )
+        # 直接從內存返回解密文件
+        original_filename = file.filename.removesuffix('.enc')
+        return attachment_response(decrypted_data, 'image/jpeg', f"decrypted_{original_filename}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"圖像解密失敗: {str(e)}")
 
 # 文本壓縮端點
 @app.post("/compress/text")
-async def compress_text(request: TextCompressRequest):
+async def compress_text(request: TextCompressRequest, accept: Optional[str] = Header(None)):
     try:
-        compressed_text = text_compressor.compress_text(request.text, request.algorithm, request.level)
+        algorithm, level = text_compressor.resolve(request.algorithm, request.level, request.preset)
+        if wants_binary(accept):
+            compressed_bytes = await run_in_thread(
+                text_compressor.compress_file_content, request.text.encode('utf-8'), algorithm, level
+            )
+            return binary_response(compressed_bytes, algorithm)
+        compressed_text = await run_in_thread(text_compressor.compress_text, request.text, algorithm, level)
         return {
             "status": "success",
             "compressed_text": compressed_text,
-            "algorithm": request.algorithm,
-            "compression_level": request.level,
+            "algorithm": algorithm,
+            "compression_level": level,
             "message": "文本壓縮成功"
         }
     except Exception as e:
@@ -305,11 +530,13 @@ async def compress_text(request: TextCompressRequest):
 @app.post("/decompress/text")
 async def decompress_text(request: TextDecompressRequest):
     try:
-        decompressed_text = text_compressor.decompress_text(request.compressed_text, request.algorithm)
+        decompressed_text, algorithm = await run_in_thread(
+            text_compressor.decompress_text_detected, request.compressed_text, request.algorithm
+        )
         return {
             "status": "success",
             "decompressed_text": decompressed_text,
-            "algorithm": request.algorithm,
+            "algorithm": algorithm,
             "message": "文本解壓成功"
         }
     except Exception as e:
@@ -318,7 +545,8 @@ async def decompress_text(request: TextDecompressRequest):
 @app.post("/compress/stats")
 async def get_compression_stats(request: TextCompressRequest):
     try:
-        stats = text_compressor.get_compression_stats(request.text, request.algorithm, request.level)
+        algorithm, level = text_compressor.resolve(request.algorithm, request.level, request.preset)
+        stats = await run_in_thread(text_compressor.get_compression_stats, request.text, algorithm, level)
         return {
             "status": "success",
             "stats": stats,
@@ -330,7 +558,17 @@ async def get_compression_stats(request: TextCompressRequest):
 @app.post("/compress/compare")
 async def compare_compression_algorithms(text: str = Form(...), level: int = Form(6)):
     try:
-        comparison = text_compressor.compare_algorithms(text, level)
+        text_bytes = text.encode('utf-8')
+        candidates = text_compressor.comparison_candidates(level)
+        # 各算法互不依賴，在線程池中並行壓縮（zstd/zlib/bz2/lzma 壓縮時釋放 GIL）
+        results = await asyncio.gather(*(
+            run_in_thread(text_compressor.compare_algorithm, text_bytes, algorithm, algorithm_level)
+            for _, algorithm, algorithm_level in candidates
+        ))
+        comparison = {
+            "original_size_bytes": len(text_bytes),
+            "algorithms": {name: result for (name, _, _), result in zip(candidates, results)}
+        }
         return {
             "status": "success",
             "comparison": comparison,
@@ -345,24 +583,12 @@ async def resize_image(
     width: int = Form(...),
     height: int = Form(...),
     maintain_aspect: bool = Form(True),
-    file: UploadFile = File(...)
+    file: UploadFile = Depends(validated_image)
 ):
     try:
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="文件必須是圖像格式")
+        resized_data = await run_image_transform(image_transform.resize_image, file, width, height, maintain_aspect)
         
-        image_data = await file.read()
-        resized_data = image_transform.resize_image(image_data, width, height, maintain_aspect)
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
-            temp_file.write(resized_data)
-            temp_file_path = temp_file.name
-        
-        return FileResponse(
-            temp_file_path,
-            media_type='image/png',
-            filename=f"resized_{file.filename}"
-        )
+        return attachment_response(resized_data, 'image/png', f"resized_{file.filename}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"圖像大小調整失敗: {str(e)}")
 
@@ -370,24 +596,12 @@ async def resize_image(
 async def rotate_image(
     angle: float = Form(...),
     expand: bool = Form(True),
-    file: UploadFile = File(...)
+    file: UploadFile = Depends(validated_image)
 ):
     try:
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="文件必須是圖像格式")
+        rotated_data = await run_image_transform(image_transform.rotate_image, file, angle, expand)
         
-        image_data = await file.read()
-        rotated_data = image_transform.rotate_image(image_data, angle, expand)
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
-            temp_file.write(rotated_data)
-            temp_file_path = temp_file.name
-        
-        return FileResponse(
-            temp_file_path,
-            media_type='image/png',
-            filename=f"rotated_{file.filename}"
-        )
+        return attachment_response(rotated_data, 'image/png', f"rotated_{file.filename}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"圖像旋轉失敗: {str(e)}")
 
@@ -397,123 +611,63 @@ async def crop_image(
     top: int = Form(...),
     right: int = Form(...),
     bottom: int = Form(...),
-    file: UploadFile = File(...)
+    file: UploadFile = Depends(validated_image)
 ):
     try:
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="文件必須是圖像格式")
-        
-        image_data = await file.read()
-        cropped_data = image_transform.crop_image(image_data, left, top, right, bottom)
+        cropped_data = await run_image_transform(image_transform.crop_image, file, left, top, right, bottom)
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
-            temp_file.write(cropped_data)
-            temp_file_path = temp_file.name
-        
-        return FileResponse(
-            temp_file_path,
-            media_type='image/png',
-            filename=f"cropped_{file.filename}"
-        )
+        return attachment_response(cropped_data, 'image/png', f"cropped_{file.filename}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"圖像裁剪失敗: {str(e)}")
 
 @app.post("/transform/image/filter")
 async def apply_image_filter(
     filter_name: str = Form(...),
-    file: UploadFile = File(...)
+    file: UploadFile = Depends(validated_image)
 ):
     try:
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="文件必須是圖像格式")
-        
-        image_data = await file.read()
-        filtered_data = image_transform.apply_filter(image_data, filter_name)
+        filtered_data = await run_image_transform(image_transform.apply_filter, file, filter_name)
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
-            temp_file.write(filtered_data)
-            temp_file_path = temp_file.name
-        
-        return FileResponse(
-            temp_file_path,
-            media_type='image/png',
-            filename=f"filtered_{file.filename}"
-        )
+        return attachment_response(filtered_data, 'image/png', f"filtered_{file.filename}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"濾鏡應用失敗: {str(e)}")
 
 @app.post("/transform/image/brightness")
 async def adjust_brightness(
     factor: float = Form(...),
-    file: UploadFile = File(...)
+    file: UploadFile = Depends(validated_image)
 ):
     try:
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="文件必須是圖像格式")
-        
-        image_data = await file.read()
-        adjusted_data = image_transform.adjust_brightness(image_data, factor)
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
-            temp_file.write(adjusted_data)
-            temp_file_path = temp_file.name
+        adjusted_data = await run_image_transform(image_transform.adjust_brightness, file, factor)
         
-        return FileResponse(
-            temp_file_path,
-            media_type='image/png',
-            filename=f"brightness_{file.filename}"
-        )
+        return attachment_response(adjusted_data, 'image/png', f"brightness_{file.filename}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"亮度調整失敗: {str(e)}")
 
 @app.post("/transform/image/contrast")
 async def adjust_contrast(
     factor: float = Form(...),
-    file: UploadFile = File(...)
+    file: UploadFile = Depends(validated_image)
 ):
     try:
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="文件必須是圖像格式")
-        
-        image_data = await file.read()
-        adjusted_data = image_transform.adjust_contrast(image_data, factor)
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
-            temp_file.write(adjusted_data)
-            temp_file_path = temp_file.name
+        adjusted_data = await run_image_transform(image_transform.adjust_contrast, file, factor)
         
-        return FileResponse(
-            temp_file_path,
-            media_type='image/png',
-            filename=f"contrast_{file.filename}"
-        )
+        return attachment_response(adjusted_data, 'image/png', f"contrast_{file.filename}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"對比度調整失敗: {str(e)}")
 
 @app.post("/transform/image/convert")
 async def convert_image_format(
     target_format: str = Form(...),
-    file: UploadFile = File(...)
+    file: UploadFile = Depends(validated_image)
 ):
     try:
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="文件必須是圖像格式")
-        
-        image_data = await file.read()
-        converted_data = image_transform.convert_format(image_data, target_format)
+        converted_data = await run_image_transform(image_transform.convert_format, file, target_format)
         
         ext = target_format.lower()
         mime_type = f'image/{ext}'
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{ext}') as temp_file:
-            temp_file.write(converted_data)
-            temp_file_path = temp_file.name
-        
-        return FileResponse(
-            temp_file_path,
-            media_type=mime_type,
-            filename=f"converted_{file.filename}.{ext}"
-        )
+        return attachment_response(converted_data, mime_type, f"converted_{file.filename}.{ext}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"格式轉換失敗: {str(e)}")
 
@@ -521,35 +675,19 @@ async def convert_image_format(
 async def create_thumbnail(
     width: int = Form(128),
     height: int = Form(128),
-    file: UploadFile = File(...)
+    file: UploadFile = Depends(validated_image)
 ):
     try:
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="文件必須是圖像格式")
+        thumbnail_data = await run_image_transform(image_transform.create_thumbnail, file, (width, height))
         
-        image_data = await file.read()
-        thumbnail_data = image_transform.create_thumbnail(image_data, (width, height))
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
-            temp_file.write(thumbnail_data)
-            temp_file_path = temp_file.name
-        
-        return FileResponse(
-            temp_file_path,
-            media_type='image/png',
-            filename=f"thumbnail_{file.filename}"
-        )
+        return attachment_response(thumbnail_data, 'image/png', f"thumbnail_{file.filename}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"縮略圖創建失敗: {str(e)}")
 
 @app.post("/transform/image/info")
-async def get_image_info(file: UploadFile = File(...)):
+async def get_image_info(file: UploadFile = Depends(validated_image)):
     try:
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="文件必須是圖像格式")
-        
-        image_data = await file.read()
-        info = image_transform.get_image_info(image_data)
+        info = await run_in_thread(image_transform.get_image_info, file.file)
         
         return {
             "status": "success",
@@ -559,6 +697,23 @@ async def get_image_info(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"圖像信息獲取失敗: {str(e)}")
 
+@app.post("/transform/image/pipeline")
+async def image_pipeline(
+    spec: str = Form(..., description='JSON 操作規格，如 {"ops": [{"type": "resize", "width": 800, "height": 600}, {"type": "brightness", "factor": 1.2}]}'),
+    file: UploadFile = Depends(validated_image)
+):
+    try:
+        pipeline = ImagePipelineRequest.model_validate_json(spec)
+        
+        # 多個操作共用一次解碼和一次編碼，而不是每個操作各自解碼、編碼一次
+        result_data, output_format = await run_image_transform(image_transform.apply_pipeline, file, pipeline.ops)
+        
+        # 文件擴展名跟隨輸出格式（管道中包含 convert 操作時與上傳文件不同）
+        ext = output_format.lower()
+        return attachment_response(result_data, f'image/{ext}', f"pipeline_{os.path.splitext(file.filename)[0]}.{ext}")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"圖像管道處理失敗: {str(e)}")
+
 # 圖像隱寫術端點
 @app.post("/stego/hide")
 async def hide_text_in_image(
@@ -571,33 +726,32 @@ async def hide_text_in_image(
 ):
     """在圖像中隱藏文本"""
     try:
-        # 讀取圖像文件
+        # 隱寫術是逐像素的純 Python 循環，在進程池中執行；跨進程需要傳遞 bytes
         image_bytes = await image.read()
         
         method = method.lower()
         if method == "lsb":
-            result_image = image_stego.hide_text_lsb(
+            result_image = await run_in_process(
+                image_stego.hide_text_lsb,
                 image_bytes, 
                 secret_text, 
                 encrypt_text=encrypt_text, 
                 password=password
             )
         elif method == "dct":
-            if encrypt_text:
-                # DCT 方法目前不支持加密，先手動加密
-                if password:
-                    encrypted_text = text_crypto.encrypt(secret_text, password)
-                    secret_text = f"ENCRYPTED:{encrypted_text}"
-            result_image = image_stego.hide_text_dct(image_bytes, secret_text, strength)
+            result_image = await run_in_process(
+                image_stego.hide_text_dct,
+                image_bytes,
+                secret_text,
+                strength,
+                encrypt_text=encrypt_text,
+                password=password
+            )
         else:
             raise ValueError(f"不支持的隱藏方法: {method}")
         
-        # 返回處理後的圖像
-        return StreamingResponse(
-            io.BytesIO(result_image),
-            media_type="image/png",
-            headers={"Content-Disposition": f"attachment; filename=hidden_{image.filename}"}
-        )
+        # 返回處理後的圖像；數據已完整在內存中，直接作為響應體發送並帶上 Content-Length
+        return attachment_response(result_image, 'image/png', f"hidden_{image.filename}")
         
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -617,19 +771,20 @@ async def extract_text_from_image(
         
         method = method.lower()
         if method == "lsb":
-            extracted_text = image_stego.extract_text_lsb(
+            extracted_text = await run_in_process(
+                image_stego.extract_text_lsb,
                 image_bytes,
                 is_encrypted=is_encrypted,
                 password=password
             )
         elif method == "dct":
-            extracted_text = image_stego.extract_text_dct(image_bytes, strength)
-            # DCT 方法的解密處理
-            if extracted_text.startswith("ENCRYPTED:"):
-                if not is_encrypted or not password:
-                    raise ValueError("檢測到加密文本，但未提供密碼")
-                encrypted_text = extracted_text[10:]  # 移除 "ENCRYPTED:" 前綴
-                extracted_text = text_crypto.decrypt(encrypted_text, password)
+            extracted_text = await run_in_process(
+                image_stego.extract_text_dct,
+                image_bytes,
+                strength,
+                is_encrypted=is_encrypted,
+                password=password
+            )
         else:
             raise ValueError(f"不支持的提取方法: {method}")
         
@@ -650,10 +805,7 @@ async def check_image_capacity(
 ):
     """檢查圖像的隱藏容量"""
     try:
-        # 讀取圖像文件
-        image_bytes = await image.read()
-        
-        capacity_info = image_stego.check_capacity(image_bytes, method)
+        capacity_info = await run_in_thread(image_stego.check_capacity, image.file, method)
         
         return {
             "image_name": image.filename,
@@ -672,8 +824,7 @@ async def detect_hidden_text(
     try:
         # 讀取圖像文件
         image_bytes = await image.read()
-        
-        detection_result = image_stego.detect_hidden_text(image_bytes, method)
+        detection_result = await run_in_process(image_stego.detect_hidden_text, image_bytes, method)
         
         return {
             "image_name": image.filename,
@@ -684,6 +835,9 @@ async def detect_hidden_text(
         raise HTTPException(status_code=400, detail=str(e))
 
 # 哈希函數端點
+# 文本長度超過此值時，多重哈希按算法並行計算；更短的文本直接計算比線程切換更快
+PARALLEL_HASH_MIN_LENGTH = 64 * 1024
+
 @app.post("/hash/text")
 async def hash_text(request: HashRequest):
     try:
@@ -714,7 +868,15 @@ async def verify_hash(request: HashVerifyRequest):
 async def multi_hash(text: str = Form(...), algorithms: str = Form("md5,sha1,sha256,sha512")):
     try:
         algorithm_list = [alg.strip() for alg in algorithms.split(',')]
-        hashes = hash_functions.multi_hash(text, algorithm_list)
+        if len(text) < PARALLEL_HASH_MIN_LENGTH:
+            hashes = hash_functions.multi_hash(text, algorithm_list)
+        else:
+            # 大輸入時每個算法在線程池中並行計算（hashlib 處理大數據時釋放 GIL）
+            results = await asyncio.gather(*(
+                run_in_thread(hash_functions.multi_hash, text, [algorithm])
+                for algorithm in algorithm_list
+            ))
+            hashes = {algorithm: digest for result in results for algorithm, digest in result.items()}
         return {
             "status": "success",
             "hashes": hashes,
@@ -723,14 +885,43 @@ async def multi_hash(text: str = Form(...), algorithms: str = Form("md5,sha1,sha
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"多重哈希計算失敗: {str(e)}")
 
+@app.post("/hash/batch")
+async def batch_hash(request: HashBatchRequest):
+    try:
+        texts = request.texts
+        if sum(map(len, texts)) < PARALLEL_HASH_MIN_LENGTH:
+            hashes = hash_functions.hash_batch(texts, request.algorithm)
+        else:
+            # 大批量時按 CPU 核心數切分，每個切片在線程池中計算，避免逐條提交任務的調度開銷
+            slice_count = os.cpu_count() or 1
+            slice_size = -(-len(texts) // slice_count)
+            results = await asyncio.gather(*(
+                run_in_thread(hash_functions.hash_batch, texts[start:start + slice_size], request.algorithm)
+                for start in range(0, len(texts), slice_size)
+            ))
+            hashes = [digest for result in results for digest in result]
+        return {
+            "status": "success",
+            "hashes": hashes,
+            "algorithm": request.algorithm,
+            "count": len(hashes),
+            "message": "批量哈希計算成功"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"批量哈希計算失敗: {str(e)}")
+
 @app.post("/hash/crunch")
 async def crunch_hash(request: CrunchHashRequest):
     try:
-        result = hash_functions.crunch_hash(
+        # PBKDF2 在 OpenSSL 中計算並釋放 GIL，用線程池；舊版逐次迭代的 Python 循環持有 GIL，用進程池
+        executor = run_in_thread if request.method == 'pbkdf2' else run_in_process
+        result = await executor(
+            hash_functions.crunch_hash,
             request.data, 
             request.salt, 
             request.iterations, 
-            request.algorithm
+            request.algorithm,
+            request.method
         )
         return {
             "status": "success",
@@ -746,10 +937,12 @@ async def verify_crunch_hash(
     stored_hash: str = Form(...),
     salt: str = Form(...),
     iterations: int = Form(10000),
-    algorithm: str = Form("sha256")
+    algorithm: str = Form("sha256"),
+    method: str = Form("pbkdf2", description="pbkdf2 或 iterated（驗證舊版哈希）")
 ):
     try:
-        is_valid = hash_functions.verify_crunch_hash(data, stored_hash, salt, iterations, algorithm)
+        executor = run_in_thread if method == 'pbkdf2' else run_in_process
+        is_valid = await executor(hash_functions.verify_crunch_hash, data, stored_hash, salt, iterations, algorithm, method)
         return {
             "status": "success",
             "is_valid": is_valid,
@@ -760,39 +953,89 @@ async def verify_crunch_hash(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Crunch Hash 驗證失敗: {str(e)}")
 
+@app.post("/hash/scrypt")
+async def scrypt_hash(request: ScryptHashRequest):
+    try:
+        # hashlib.scrypt 在 OpenSSL 中計算並釋放 GIL
+        result = await run_in_thread(
+            hash_functions.scrypt_hash,
+            request.data,
+            request.salt,
+            request.n,
+            request.r,
+            request.p,
+            request.dklen
+        )
+        return {
+            "status": "success",
+            "scrypt_hash": result,
+            "message": "scrypt 哈希計算成功"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"scrypt 哈希計算失敗: {str(e)}")
+
 @app.post("/hash/file")
 async def hash_file(algorithm: str = Form("sha256"), file: UploadFile = File(...)):
     try:
-        file_content = await file.read()
-        hash_value = hash_functions.hash_file_content(file_content, algorithm)
+        # 分塊增量哈希，不將整個文件讀入內存
+        hash_value, file_size = await run_in_thread(hash_functions.hash_file_stream, file.file, algorithm)
         return {
             "status": "success",
             "file_hash": hash_value,
             "algorithm": algorithm,
             "filename": file.filename,
-            "file_size": len(file_content),
+            "file_size": file_size,
             "message": "文件哈希計算成功"
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"文件哈希計算失敗: {str(e)}")
 
+@app.post("/hash/file/multi")
+async def multi_hash_file(algorithms: str = Form("md5,sha1,sha256,sha512"), file: UploadFile = File(...)):
+    try:
+        algorithm_list = [alg.strip() for alg in algorithms.split(',')]
+        # 文件只讀取一遍，所有算法在同一個分塊循環中更新
+        hashes, file_size = await run_in_thread(hash_functions.multi_hash_stream, file.file, algorithm_list)
+        return {
+            "status": "success",
+            "file_hashes": hashes,
+            "filename": file.filename,
+            "file_size": file_size,
+            "message": "多重文件哈希計算成功"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"多重文件哈希計算失敗: {str(e)}")
+
 # 文件加密端點
 @app.post("/encrypt/file")
 async def encrypt_file_endpoint(
     file: UploadFile = File(...),
     password: str = Form(...),
-    preserve_metadata: bool = Form(True)
+    preserve_metadata: bool = Form(True),
+    accept: Optional[str] = Header(None)
 ):
     """加密文件"""
     try:
-        contents = await file.read()
-        encrypted_data = file_crypto.encrypt_file(
-            contents, password, file.filename, preserve_metadata
-        )
+        # 直接傳入上傳的臨時文件對象，按 1 MiB 分塊讀取加密
+        if wants_binary(accept):
+            # 原始字節響應逐塊加密、逐塊發送，內存佔用與文件大小無關；上傳的臨時文件在響應發送完後才關閉
+            encrypted_size, chunks = await run_in_thread(
+                file_crypto.encrypt_file_stream,
+                file.file, password, file.filename, preserve_metadata
+            )
+            return attachment_stream_response(
+                chunks, 'application/octet-stream', f"{file.filename}.enc",
+                headers={"Content-Length": str(encrypted_size), "X-Encrypted-Size": str(encrypted_size)}
+            )
         
+        # JSON 響應需要對完整密文做 base64 編碼，因此整體加密
+        encrypted_data = await run_in_thread(
+            file_crypto.encrypt_file,
+            file.file, password, file.filename, preserve_metadata
+        )
         return {
             "message": "文件加密成功",
-            "encrypted_data": base64.b64encode(encrypted_data).decode(),
+            "encrypted_data": b64encode_as_string(encrypted_data),
             "original_filename": file.filename,
             "encrypted_size": len(encrypted_data)
         }
@@ -802,25 +1045,33 @@ async def encrypt_file_endpoint(
 @app.post("/decrypt/file")
 async def decrypt_file_endpoint(
     encrypted_file: UploadFile = File(...),
-    password: str = Form(...)
+    password: str = Form(...),
+    accept: Optional[str] = Header(None)
 ):
     """解密文件"""
     try:
-        encrypted_data = await encrypted_file.read()
-        # 如果是base64編碼的數據，嘗試解碼
-        try:
-            if len(encrypted_data) % 4 == 0:
-                test_decode = base64.b64decode(encrypted_data)
-                if file_crypto.is_encrypted_file(test_decode):
-                    encrypted_data = test_decode
-        except:
-            pass
+        # 只讀取開頭幾個字節判斷格式：原始加密文件直接按塊解密，base64 形式（如 /encrypt/file 的 JSON 響應）才整體解碼
+        prefix = await encrypted_file.read(len(file_crypto.base64_header_prefix))
+        await encrypted_file.seek(0)
+        if file_crypto.is_base64_encrypted_file(prefix):
+            encrypted_data = b64decode(await encrypted_file.read())
+        else:
+            encrypted_data = encrypted_file.file
         
-        decrypted_data, metadata = file_crypto.decrypt_file(encrypted_data, password)
+        if wants_binary(accept):
+            # 元數據和第一個分塊在開始響應前解密（密碼錯誤仍返回 400），其餘分塊邊解密邊發送；
+            # 之後的分塊認證失敗時連接會被中斷，客戶端不會收到完整的響應
+            metadata, chunks = await run_in_thread(file_crypto.decrypt_file_stream, encrypted_data, password)
+            original_filename = metadata.get('filename') or encrypted_file.filename.removesuffix('.enc')
+            return attachment_stream_response(
+                chunks, 'application/octet-stream', original_filename,
+                headers={"X-Original-Mime-Type": metadata.get('mime_type', 'application/octet-stream')}
+            )
         
+        decrypted_data, metadata = await run_in_thread(file_crypto.decrypt_file, encrypted_data, password)
         return {
             "message": "文件解密成功",
-            "decrypted_data": base64.b64encode(decrypted_data).decode(),
+            "decrypted_data": b64encode_as_string(decrypted_data),
             "metadata": metadata,
             "decrypted_size": len(decrypted_data)
         }
@@ -834,8 +1085,8 @@ async def get_file_info_endpoint(
 ):
     """獲取加密文件信息"""
     try:
-        encrypted_data = await encrypted_file.read()
-        info = file_crypto.get_file_info(encrypted_data, password)
+        # 只讀取文件頭和元數據，無需讀入整個加密文件
+        info = await run_in_thread(file_crypto.get_file_info, encrypted_file.file, password)
         
         return {
             "message": "獲取文件信息成功",
@@ -846,10 +1097,12 @@ async def get_file_info_endpoint(
 
 # 數字簽名端點
 @app.post("/signature/generate-keypair")
-def generate_keypair_endpoint(request: KeyPairRequest):
+async def generate_keypair_endpoint(request: KeyPairRequest):
     """生成RSA密鑰對"""
     try:
-        result = digital_signer.generate_key_pair(
+        # RSA 素數搜索耗時數百毫秒到數秒，在進程池中執行，不佔用事件循環和其他請求的 GIL
+        result = await run_in_process(
+            digital_signer.generate_key_pair,
             key_size=request.key_size,
             password=request.password
         )
@@ -862,38 +1115,41 @@ def generate_keypair_endpoint(request: KeyPairRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/signature/sign")
-def sign_data_endpoint(request: SignDataRequest):
+async def sign_data_endpoint(request: SignDataRequest):
     """對數據進行數字簽名"""
     try:
-        result = digital_signer.sign_data(
+        result = await run_in_thread(
+            digital_signer.sign_data,
             data=request.data,
             private_key_pem=request.private_key,
             password=request.password,
             hash_algorithm=request.hash_algorithm
         )
         
-        return {
+        # 直接返回 ORJSONResponse，跳過 FastAPI 對返回值的 jsonable_encoder 遍歷，一次序列化為字節
+        return ORJSONResponse({
             "message": "數字簽名成功",
             **result
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/signature/verify")
-def verify_signature_endpoint(request: VerifySignatureRequest):
+async def verify_signature_endpoint(request: VerifySignatureRequest):
     """驗證數字簽名"""
     try:
-        result = digital_signer.verify_signature(
+        result = await run_in_thread(
+            digital_signer.verify_signature,
             data=request.data,
             signature=request.signature,
             public_key_pem=request.public_key,
             hash_algorithm=request.hash_algorithm
         )
         
-        return {
+        return ORJSONResponse({
             "message": "簽名驗證完成",
             **result
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -906,19 +1162,20 @@ async def sign_file_endpoint(
 ):
     """對文件進行數字簽名"""
     try:
-        file_data = await file.read()
-        result = digital_signer.sign_file(
-            file_data=file_data,
+        # 直接傳入上傳的文件對象，在線程池中分塊計算摘要，無需將整個文件讀入內存
+        result = await run_in_thread(
+            digital_signer.sign_file,
+            file_data=file.file,
             private_key_pem=private_key,
             password=password,
             hash_algorithm=hash_algorithm
         )
         
-        return {
+        return ORJSONResponse({
             "message": "文件簽名成功",
             "filename": file.filename,
             **result
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -931,19 +1188,19 @@ async def verify_file_signature_endpoint(
 ):
     """驗證文件數字簽名"""
     try:
-        file_data = await file.read()
-        result = digital_signer.verify_file_signature(
-            file_data=file_data,
+        result = await run_in_thread(
+            digital_signer.verify_file_signature,
+            file_data=file.file,
             signature=signature,
             public_key_pem=public_key,
             hash_algorithm=hash_algorithm
         )
         
-        return {
+        return ORJSONResponse({
             "message": "文件簽名驗證完成",
             "filename": file.filename,
             **result
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -960,9 +1217,11 @@ def generate_qr_endpoint(request: QRGenerateRequest):
             border=request.border
         )
         
+        if request.response_format == "png":
+            return qr_png_response(qr_image)
         return {
             "message": "QR碼生成成功",
-            "qr_code": base64.b64encode(qr_image).decode(),
+            "qr_code": b64encode_as_string(qr_image),
             "data": request.data,
             "size": len(qr_image)
         }
@@ -973,8 +1232,7 @@ def generate_qr_endpoint(request: QRGenerateRequest):
 async def read_qr_endpoint(qr_image: UploadFile = File(...)):
     """讀取QR碼"""
     try:
-        image_data = await qr_image.read()
-        result = qr_generator.read_qr_code(image_data)
+        result = await run_in_thread(qr_generator.read_qr_code, qr_image.file)
         
         return {
             "message": "QR碼讀取完成",
@@ -994,9 +1252,11 @@ def generate_wifi_qr_endpoint(request: QRWifiRequest):
             hidden=request.hidden
         )
         
+        if request.response_format == "png":
+            return qr_png_response(qr_image)
         return {
             "message": "WiFi QR碼生成成功",
-            "qr_code": base64.b64encode(qr_image).decode(),
+            "qr_code": b64encode_as_string(qr_image),
             "wifi_info": {
                 "ssid": request.ssid,
                 "security": request.security,
@@ -1010,30 +1270,46 @@ def generate_wifi_qr_endpoint(request: QRWifiRequest):
 def generate_contact_qr_endpoint(request: QRContactRequest):
     """生成聯絡人QR碼"""
     try:
-        contact_info = {k: v for k, v in request.dict().items() if v is not None}
+        contact_info = request.model_dump(exclude_none=True, exclude={"response_format"})
         qr_image = qr_generator.generate_contact_qr(contact_info)
         
+        if request.response_format == "png":
+            return qr_png_response(qr_image)
         return {
             "message": "聯絡人QR碼生成成功",
-            "qr_code": base64.b64encode(qr_image).decode(),
+            "qr_code": b64encode_as_string(qr_image),
             "contact_info": contact_info
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/qr/url")
-def generate_url_qr_endpoint(url: str = Form(...)):
+def generate_url_qr_endpoint(url: str = Form(...), response_format: Literal["json", "png"] = Form("json")):
     """生成URL QR碼"""
     try:
         qr_image = qr_generator.generate_url_qr(url)
         
+        if response_format == "png":
+            return qr_png_response(qr_image)
         return {
             "message": "URL QR碼生成成功",
-            "qr_code": base64.b64encode(qr_image).decode(),
+            "qr_code": b64encode_as_string(qr_image),
             "url": url
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    # 每個 CPU 核心一個工作進程，並使用 uvloop 事件循環和 httptools HTTP 解析器
+    uvicorn.run(
+        "main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=int(os.getenv("WORKERS", os.cpu_count() or 1)),
+        loop="uvloop",
+        http="httptools",
+        backlog=4096,
+        limit_concurrency=1024,
+        # 保持連接 30 秒（uvicorn 默認僅 5 秒），客戶端連續請求時無需重新握手
+        timeout_keep_alive=int(os.getenv("KEEP_ALIVE", "30"))
+    )
@@ -0,0 +1,261 @@
+# ASGI 中間件
+import hashlib
+from collections import OrderedDict
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.exceptions import HTTPException
+from starlette.middleware.gzip import GZipResponder
+from starlette.responses import JSONResponse, Response
+
+try:
+    # BLAKE3 計算緩存鍵比 BLAKE2 更快；未安裝時回退到標準庫
+    from blake3 import blake3 as _key_hasher
+except ImportError:
+    _key_hasher = None
+
+try:
+    # libdeflate 的 gzip 壓縮比標準庫 zlib 快約一倍，輸出仍是標準 gzip 格式
+    import deflate
+except ImportError:
+    deflate = None
+
+
+class ETagMiddleware:
+    """為確定性端點添加 ETag，命中 If-None-Match 時直接返回 304，並緩存已計算的響應"""
+
+    def __init__(self, app, paths, max_cache_bytes: int = 64 * 1024 * 1024,
+                 max_request_size: int = 4 * 1024 * 1024,
+                 max_response_size: int = 1024 * 1024):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_cache_bytes = max_cache_bytes
+        self.max_request_size = max_request_size
+        self.max_response_size = max_response_size
+        self._cache = OrderedDict()  # etag -> (狀態碼, 響應頭, 響應體)
+        self._cache_bytes = 0  # 緩存中響應體的總字節數
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        # 緩衝請求體；超過上限時放棄 ETag 處理，原樣轉發
+        messages = []
+        body_parts = []
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            chunk = message.get("body", b"")
+            body_parts.append(chunk)
+            size += len(chunk)
+            more_body = message.get("more_body", False)
+            if size > self.max_request_size:
+                await self.app(scope, self._replay(messages, receive), send)
+                return
+
+        headers = Headers(scope=scope)
+        etag = self._compute_etag(scope, headers, b"".join(body_parts))
+        # Cache-Control: no-store 的請求既不讀取也不寫入服務端緩存
+        use_cache = "no-store" not in headers.get("cache-control", "")
+
+        if self._matches(headers.get("if-none-match"), etag):
+            response = Response(status_code=304, headers={"ETag": etag})
+            await response(scope, receive, send)
+            return
+
+        cached = self._cache.get(etag) if use_cache else None
+        if cached is not None:
+            self._cache.move_to_end(etag)
+            status, raw_headers, body = cached
+            await send({"type": "http.response.start", "status": status, "headers": list(raw_headers)})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        response_start = {}
+        response_parts = []
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start":
+                if message["status"] == 200:
+                    MutableHeaders(scope=message)["ETag"] = etag
+                # 複製響應頭：外層中間件（如 gzip）可能會原地修改
+                response_start["status"] = message["status"]
+                response_start["headers"] = list(message["headers"])
+            elif message["type"] == "http.response.body" and use_cache and response_start.get("status") == 200:
+                response_parts.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    self._store(etag, response_start, b"".join(response_parts))
+            await send(message)
+
+        await self.app(scope, self._replay(messages, receive), send_with_etag)
+
+    def _compute_etag(self, scope, headers: Headers, body: bytes) -> str:
+        """根據請求方法、路徑、查詢字符串、Accept 頭和請求體計算 ETag"""
+        # multipart 的 boundary 每次請求都是隨機的，計算前先移除
+        content_type = headers.get("content-type", "")
+        if content_type.startswith("multipart/") and "boundary=" in content_type:
+            boundary = content_type.split("boundary=", 1)[1].split(";", 1)[0].strip('"')
+            body = body.replace(boundary.encode("latin-1"), b"")
+
+        hasher = _key_hasher() if _key_hasher is not None else hashlib.blake2b(digest_size=8)
+        hasher.update(scope["method"].encode("latin-1"))
+        hasher.update(scope["path"].encode("utf-8"))
+        hasher.update(scope.get("query_string", b""))
+        # 同一請求可按 Accept 頭返回 JSON 或原始字節，兩者必須使用不同的 ETag
+        hasher.update(headers.get("accept", "").encode("latin-1"))
+        hasher.update(body)
+        return f'"{hasher.hexdigest()[:16]}"'
+
+    def _matches(self, if_none_match, etag: str) -> bool:
+        """檢查 If-None-Match 頭是否與 ETag 匹配"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+        return etag in candidates
+
+    def _store(self, etag: str, response_start: dict, body: bytes):
+        """將響應存入 LRU 緩存，按響應體總字節數而非條目數淘汰"""
+        if len(body) > self.max_response_size:
+            return
+        previous = self._cache.pop(etag, None)
+        if previous is not None:
+            self._cache_bytes -= len(previous[2])
+        self._cache[etag] = (response_start["status"], response_start["headers"], body)
+        self._cache_bytes += len(body)
+        while self._cache_bytes > self.max_cache_bytes:
+            _, (_, _, evicted) = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted)
+
+    @staticmethod
+    def _replay(messages, receive):
+        """先重放已緩衝的請求消息，再繼續從原始 receive 讀取"""
+        pending = list(messages)
+
+        async def replay():
+            if pending:
+                return pending.pop(0)
+            return await receive()
+
+        return replay
+
+
+class DeflateGZipResponder(GZipResponder):
+    """一次性發送的響應體用 libdeflate 整塊壓縮；流式響應仍由 GzipFile 逐塊壓縮"""
+
+    def __init__(self, app, minimum_size: int, compresslevel: int = 9):
+        super().__init__(app, minimum_size, compresslevel=compresslevel)
+        self.compresslevel = compresslevel
+
+    async def send_with_gzip(self, message):
+        if (message["type"] == "http.response.body" and not self.started and not self.content_encoding_set
+                and not message.get("more_body", False) and len(message.get("body", b"")) >= self.minimum_size):
+            self.started = True
+            body = bytes(deflate.gzip_compress(message["body"], self.compresslevel))
+
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers["Content-Encoding"] = "gzip"
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            message["body"] = body
+
+            await self.send(self.initial_message)
+            await self.send(message)
+            return
+        await super().send_with_gzip(message)
+
+
+class CompressionMiddleware:
+    """響應壓縮：客戶端支持時優先使用 Brotli，否則回退到 gzip；圖像和二進制響應原樣返回"""
+
+    # 這些響應已經是壓縮或加密過的數據，再壓縮只會浪費 CPU
+    incompressible_types = ("image/", "application/octet-stream", "application/zip")
+
+    def __init__(self, app, minimum_size: int = 512, gzip_level: int = 1, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        try:
+            from brotli_asgi import BrotliResponder, Mode
+            self._brotli_responder = BrotliResponder
+            self._brotli_mode = Mode.text
+        except ImportError:
+            # 未安裝 brotli-asgi 時只使用 gzip
+            self._brotli_responder = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        if self._brotli_responder is not None and "br" in accept_encoding:
+            # Brotli 質量 4 的壓縮速度與 gzip 相當，但壓縮率更高
+            responder = self._brotli_responder(
+                self._bypass_incompressible(send), self.brotli_quality, self._brotli_mode, 22, 0, self.minimum_size
+            )
+        elif "gzip" in accept_encoding:
+            gzip_responder = DeflateGZipResponder if deflate is not None else GZipResponder
+            responder = gzip_responder(self._bypass_incompressible(send), self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        await responder(scope, receive, send)
+
+    def _bypass_incompressible(self, send):
+        """包裝內層應用：響應類型不可壓縮時，所有消息繞過壓縮器直接發送"""
+        async def app(scope, receive, compress_send):
+            target = compress_send
+
+            async def route(message):
+                nonlocal target
+                if message["type"] == "http.response.start":
+                    content_type = Headers(raw=message["headers"]).get("content-type", "")
+                    if content_type.startswith(self.incompressible_types):
+                        target = send
+                await target(message)
+
+            await self.app(scope, receive, route)
+
+        return app
+
+
+class UploadLimitMiddleware:
+    """按路徑限制請求體大小，Content-Length 超限時在讀取請求體之前直接返回 413"""
+
+    def __init__(self, app, default_limit: int, limits: dict = None):
+        self.app = app
+        self.default_limit = default_limit
+        self.limits = dict(limits or {})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limits.get(scope["path"], self.default_limit)
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse({"detail": f"請求體過大，上限為 {limit} 字節"}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        # 沒有 Content-Length（分塊傳輸）時，邊接收邊計數，超限即中止
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=f"請求體過大，上限為 {limit} 字節")
+            return message
+
+        await self.app(scope, limited_receive, send)